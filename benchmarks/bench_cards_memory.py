@@ -0,0 +1,80 @@
+"""
+Measure memory and allocations of dealing hands with tracemalloc.
+
+Every hand is dealt from a fresh ``Deck`` and kept alive, so that the current
+traced memory is the footprint of the dealt hands, and the peak also includes
+the decks being built. Dataclass cards, rebuilt at every deck as before cards
+were interned, are measured as a reference.
+Run with ``python -m benchmarks.bench_cards_memory``.
+"""
+import argparse
+import dataclasses
+import random
+import time
+import tracemalloc
+
+from blackjack.blackjack import Deck, Hand
+
+
+@dataclasses.dataclass
+class DataclassCard:
+    rank: str
+    suit: str
+
+    @property
+    def rank_numeric(self):
+        if self.rank in list('JQK'):
+            return 10
+        elif self.rank.isdigit():
+            return int(self.rank)
+        return 11
+
+
+class DataclassDeck(Deck):
+    def __init__(self):
+        self.cards = [
+            DataclassCard(rank, suit) for suit in self.suits for rank in self.ranks
+        ]
+        random.shuffle(self.cards)
+
+
+def deal(deck_class, n_hands):
+    hands = []
+    for _ in range(n_hands):
+        hands.append(Hand(deck_class().pick(2)))
+    return hands
+
+
+def measure(deck_class, n_hands):
+    random.seed(0)
+    tracemalloc.start()
+    start = time.perf_counter()
+    hands = deal(deck_class, n_hands)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    tracemalloc.stop()
+    del hands
+    return current, peak, blocks, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--hands', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(
+        f'{"cards":>10} {"current (MB)":>13} {"peak (MB)":>10}'
+        f' {"blocks":>10} {"time (s)":>9}'
+    )
+    for name, deck_class in (('interned', Deck), ('dataclass', DataclassDeck)):
+        current, peak, blocks, elapsed = measure(deck_class, args.hands)
+        print(
+            f'{name:>10} {current / 2**20:>13.1f} {peak / 2**20:>10.1f}'
+            f' {blocks:>10} {elapsed:>9.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
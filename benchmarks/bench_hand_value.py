@@ -0,0 +1,58 @@
+"""
+Time ``Hand.value`` on hands holding from 1 to 8 aces.
+
+The combinatorial valuation used before hands kept a running total is timed
+as a reference. Run with ``python -m benchmarks.bench_hand_value``.
+"""
+import argparse
+import itertools
+import timeit
+
+from blackjack.blackjack import Card, Hand
+
+
+def combinatorial_value(hand):
+    """Value ``hand`` by enumerating every assignment of 1 or 11 to its aces."""
+    aces = 0
+    cumulative = 0
+    for card in hand.cards:
+        if card.rank_numeric == 11:
+            aces += 1
+        else:
+            cumulative += card.rank_numeric
+    if not aces:
+        return cumulative
+    sums = []
+    min_overflow = None
+    for comb in itertools.combinations([1, 11] * aces, aces):
+        distance = 21 - sum(comb) - cumulative
+        if distance >= 0:
+            sums.append(distance)
+        elif min_overflow is None or distance > min_overflow:
+            min_overflow = distance
+    if sums:
+        return 21 - min(sums)
+    return 21 - min_overflow
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--number', type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f'{"aces":>4} {"value (us)":>12} {"combinatorial (us)":>20}')
+    for aces in range(1, 9):
+        hand = Hand([Card('A', '♠')] * aces + [Card('2', '♠')])
+        assert hand.value == combinatorial_value(hand)
+        incremental = timeit.timeit(lambda: hand.value, number=args.number)
+        combinatorial = timeit.timeit(
+            lambda: combinatorial_value(hand), number=max(1, args.number // 100)
+        ) * 100
+        print(
+            f'{aces:>4} {incremental / args.number * 1e6:>12.3f}'
+            f' {combinatorial / args.number * 1e6:>20.3f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Measure the import time of every command line mode with ``-X importtime``.
+
+Each mode imports the modules it needs in a fresh interpreter, and the
+cumulative import time of the slowest modules is printed, along with the
+heavy dependencies that were loaded. The best of ``--repeat`` runs is kept.
+Run with ``python -m benchmarks.bench_importtime``.
+"""
+import argparse
+import subprocess
+import sys
+
+# Code run by each mode before doing any work
+MODES = {
+    'cli': 'import blackjack.__main__',
+    'simulator': 'from blackjack.blackjack import SimulatorModel; SimulatorModel()',
+    'evaluation': 'from blackjack.policies import get_policy, make_model',
+    'parallel': 'import blackjack.parallel',
+    'brain': 'import blackjack.brain',
+    'batch': 'import blackjack.env',
+}
+
+HEAVY_MODULES = ('bonsai_connector', 'requests', 'urllib3', 'numpy')
+
+
+def import_times(code):
+    """
+    Return the cumulative import time of every module imported by ``code``,
+    in microseconds, and the total import time.
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, check=True,
+    )
+    times = {}
+    total = 0
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+        # Nested imports are indented, their time is in the outermost ones
+        if not name.startswith('  '):
+            total += int(cumulative)
+    return times, total
+
+
+def measure(code, repeat):
+    return min((import_times(code) for _ in range(repeat)), key=lambda run: run[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=5)
+    parser.add_argument('modes', nargs='*', help=f'Any of {", ".join(MODES)}')
+    args = parser.parse_args()
+    for mode in args.modes:
+        if mode not in MODES:
+            parser.error(f'Unknown mode {mode}.')
+
+    for mode in args.modes or MODES:
+        times, total = measure(MODES[mode], args.repeat)
+        heavy = [
+            module for module in HEAVY_MODULES
+            if any(name.split('.')[0] == module for name in times)
+        ]
+        print(f'{mode}: {total / 1000:.1f} ms, heavy imports: {heavy or "none"}')
+        for name in sorted(times, key=times.get, reverse=True)[:args.top]:
+            print(f'{name:>32}: {times[name] / 1000:>8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Compare per-episode cost of exception-driven and outcome-driven games.
+
+Games are dealt before timing, so that only the play is measured.
+
+Run with ``python -m benchmarks.bench_outcome``.
+"""
+import argparse
+import random
+import timeit
+
+from blackjack.blackjack import (
+    Blackjack, GameDrawException, GameLostException, GameSurrenderException,
+    GameWonException, Outcome,
+)
+
+game_exceptions = (
+    GameDrawException, GameLostException, GameSurrenderException, GameWonException
+)
+
+
+def choose(game):
+    return 'hit' if game.player_hand.value < 17 else 'stay'
+
+
+def play_raising(games):
+    for game in games:
+        try:
+            while True:
+                game.step(choose(game))
+        except game_exceptions:
+            pass
+
+
+def play_outcome(games):
+    for game in games:
+        while game.play(choose(game)) == Outcome.PLAY:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-n', '--episodes', type=int, default=20_000)
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for name, func in (('exceptions', play_raising), ('outcome', play_outcome)):
+        timings = []
+        for _ in range(args.repeat):
+            random.seed(0)
+            games = [Blackjack() for _ in range(args.episodes)]
+            timings.append(timeit.timeit(lambda: func(games), number=1))
+        print(f'{name:>12}: {min(timings) / args.episodes * 1e6:.2f} us/episode')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Benchmark the hot paths of the simulator.
+
+Results are saved as JSON, with the time per operation of every benchmark.
+Compare with a previous run to flag regressions beyond a threshold::
+
+    python -m benchmarks.suite --output baseline.json
+    python -m benchmarks.suite --compare baseline.json --threshold 0.1
+
+The exit status is 1 when a benchmark regressed.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import platform
+import random
+import sys
+import timeit
+
+from blackjack.blackjack import Blackjack, Card, Deck, Hand, Shoe
+from blackjack.policies import AVAILABLE_POLICIES, BasicPolicy, get_policy, make_model
+
+EPISODE_POLICIES = [
+    policy for policy in AVAILABLE_POLICIES if policy not in ('player', 'brain')
+]
+
+
+def bench_deck():
+    return Deck
+
+
+def bench_deal():
+    shoe = Shoe()
+
+    def deal():
+        shoe.shuffle()
+        shoe.pick(2)
+        shoe.pick()
+        shoe.pick()
+    return deal
+
+
+def bench_hand_value(aces):
+    hand = Hand([Card('A', '♠')] * aces + [Card('5', '♠')])
+    return lambda: hand.value
+
+
+def bench_state():
+    game = Blackjack()
+    return lambda: game.state
+
+
+def bench_episode(policy_name):
+    policy = get_policy(policy_name, host='localhost', port=5000)
+    model = make_model(policy)
+
+    def episode():
+        state = model.reset({})
+        while state['result'] < 0:
+            state = model.step(policy.step(state))
+    return episode
+
+
+def bench_strategy_matrix():
+    player = Hand([Card('A', '♠'), Card('6', '♥')])
+    dealer = Hand([Card('9', '♦')])
+    return lambda: BasicPolicy.strategy_matrix(player, dealer, True)
+
+
+def benchmarks():
+    """Return the benchmarks by name, as functions building the timed callable."""
+    suite = {'deck': bench_deck, 'deal': bench_deal, 'state': bench_state}
+    for aces in range(1, 9):
+        suite[f'hand_value[{aces}]'] = lambda aces=aces: bench_hand_value(aces)
+    for policy in EPISODE_POLICIES:
+        suite[f'episode[{policy}]'] = lambda policy=policy: bench_episode(policy)
+    suite['strategy_matrix'] = bench_strategy_matrix
+    return suite
+
+
+def run(repeat=5):
+    """Return the best time per operation of every benchmark, in seconds."""
+    results = {}
+    for name, build in benchmarks().items():
+        random.seed(0)
+        # Silence the tracebacks of games halted by invalid random actions
+        with contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            try:
+                timer = timeit.Timer(build())
+                number, _ = timer.autorange()
+                best = min(timer.repeat(repeat=repeat, number=number))
+            except Exception as exc:
+                results[name] = {'error': f'{type(exc).__name__}: {exc}'}
+                continue
+        results[name] = {'seconds': best / number, 'number': number}
+    return results
+
+
+def compare(baseline, current, threshold):
+    """Print the relative change of every benchmark and return the regressions."""
+    regressions = []
+    for name, result in current.items():
+        old = baseline.get(name, {})
+        if 'seconds' not in result or 'seconds' not in old:
+            print(f'{name:>32}: {result.get("error", "not in baseline")}')
+            continue
+        change = result['seconds'] / old['seconds'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f'{name:>32}: {result["seconds"] * 1e6:>10.3f} us {change:>+8.1%}{flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-o', '--output', help='File where results are saved')
+    parser.add_argument('--compare', help='Results of a previous run')
+    parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='Relative slowdown flagged as regression',
+    )
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(repeat=args.repeat)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump({
+                'date': datetime.datetime.now().isoformat(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': results,
+            }, fp, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)['results']
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
+    else:
+        for name, result in results.items():
+            if 'seconds' in result:
+                print(f'{name:>32}: {result["seconds"] * 1e6:>10.3f} us')
+            else:
+                print(f'{name:>32}: {result["error"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,53 +1,250 @@
 """Main connector to the Bonsai platform."""
 import argparse
-import time
+import sys
 
-from bonsai_connector import BonsaiConnector
-
-from blackjack.blackjack import SimulatorModel
-from blackjack.policies import AVAILABLE_POLICIES, evaluate_policy, generate_chart
+from blackjack.blackjack import SimulatorModel, interface_fields, load_interface
+from blackjack.policies import (
+    AVAILABLE_POLICIES, evaluate_policy, generate_chart, get_policy,
+)
 
 
 parser = argparse.ArgumentParser(description="Run a simulation")
 parser.add_argument('-p', '--policy', choices=AVAILABLE_POLICIES)
 parser.add_argument('-e', '--episodes', type=int, default=100)
+parser.add_argument(
+    '-w', '--workers', type=int, default=1,
+    help='Number of processes used to evaluate a policy',
+)
+parser.add_argument(
+    '-s', '--seed', type=int, default=None,
+    help='Master seed for reproducible policy evaluations',
+)
+parser.add_argument(
+    '--report-every', type=int, default=10_000,
+    help='Print running statistics of the evaluation every this many games',
+)
+parser.add_argument(
+    '--target-stderr', type=float, default=None,
+    help='Stop evaluating once the standard error of the mean reward is below this',
+)
+parser.add_argument(
+    '--exact', action='store_true', default=False,
+    help='Compute the exact outcomes of a deterministic policy instead of sampling',
+)
+parser.add_argument(
+    '--decks', type=int, default=1,
+    help='Number of decks in the shoe of --exact, 0 for an infinite shoe',
+)
+parser.add_argument(
+    '--compare', type=str, default=None,
+    help='Comma separated policies played on the same cards, compared with the first',
+)
+parser.add_argument(
+    '--record', type=str, default=None,
+    help='Directory of the replay where evaluated episodes are recorded',
+)
 parser.add_argument('-v', '--verbose', action='store_true', default=False)
 parser.add_argument(
     '--host', type=str, default='localhost', help='Host of deployed brain'
 )
 parser.add_argument('--port', type=int, default=5000, help='Port of deployed brain')
+parser.add_argument(
+    '-c', '--concurrency', type=int, default=1,
+    help='Number of games played concurrently against a deployed brain',
+)
+parser.add_argument(
+    '--cache-file', type=str, default=None,
+    help='File where decisions of deterministic policies are cached across runs',
+)
+parser.add_argument(
+    '--cache-size', type=int, default=None,
+    help='Maximum number of decisions kept in cache',
+)
+parser.add_argument(
+    '--timeout', type=float, default=10, help='Timeout of brain requests in seconds'
+)
+parser.add_argument(
+    '--retries', type=int, default=3, help='Retries of failed brain requests'
+)
+parser.add_argument(
+    '--instances', type=int, default=1,
+    help='Number of simulator instances run side by side',
+)
+parser.add_argument(
+    '--sessions', type=int, default=1,
+    help='Number of simulator sessions served by each instance',
+)
+parser.add_argument(
+    '--session-concurrency', type=int, default=None,
+    help='Maximum number of sessions waiting on the platform at a time',
+)
+parser.add_argument(
+    '--local', action='store_true', default=False,
+    help='Play --episodes with --policy through a local stand-in of the platform '
+    'and report the throughput of the simulator',
+)
+parser.add_argument(
+    '--policy-table', type=str, default=None,
+    help='Evaluate, or chart, the policy table saved in this file',
+)
+parser.add_argument(
+    '--compile-table', type=str, default=None,
+    help='Compile --policy into a policy table saved in this file',
+)
+parser.add_argument(
+    '--profile', action='store_true', default=False,
+    help='Print the time spent in every phase of the simulator and cProfile stats',
+)
+parser.add_argument(
+    '--profile-output', type=str, default=None,
+    help='File where cProfile stats of --profile are saved',
+)
+parser.add_argument(
+    '--log-file', type=str, default=None,
+    help='File where the events of the simulator are logged instead of stdout',
+)
+parser.add_argument(
+    '--log-format', choices=('text', 'json'), default='text',
+    help='Log events as text or JSON lines',
+)
+parser.add_argument(
+    '--log-every', type=int, default=1,
+    help='Only log the events of one episode out of this many',
+)
+parser.add_argument(
+    '--log-terminal', action='store_true', default=False,
+    help='Only log the states ending a game',
+)
+parser.add_argument(
+    '--log-counters', type=float, default=None,
+    help='Log episodes per second and result rates every this many seconds '
+    'instead of events',
+)
 parser.add_argument(
     '--generate-chart', action='store_true', default=False,
     help='Generate a strategy chart from deployed brain',
 )
 
 
-def clean_state(state):
-    allowed_types = (bool, dict, float, int, list)
-    return {key: val for key, val in state.items() if isinstance(val, allowed_types)}
+def open_event_log(args):
+    from blackjack.eventlog import EventLog
+
+    return EventLog(
+        args.log_file or sys.stdout, every=args.log_every,
+        terminal=args.log_terminal, json_lines=args.log_format == 'json',
+        counters=args.log_counters,
+    )
+
 
+def run_interface(verbose, event_log):
+    from bonsai_connector import BonsaiConnector
 
-def run_interface(verbose):
-    sim = SimulatorModel()
+    from blackjack.local import clean_state
 
-    with BonsaiConnector(sim.interface, verbose=verbose) as agent:
+    # Only compute the fields sent to the platform
+    sim = SimulatorModel(fields=interface_fields(load_interface()))
+
+    with event_log, BonsaiConnector(sim.interface, verbose=verbose) as agent:
         state = None
         while True:
             if state is None:
                 state = {'halted': False}
             event = agent.next_event(clean_state(state))
             state = sim.dispatch_event(event)
-            print(time.strftime('%H:%M:%S'), event.event_type, state)
+            event_log.log(event.event_type, state)
 
 
 def main():
     args = parser.parse_args()
-    if args.policy:
-        evaluate_policy(args.episodes, args.policy, host=args.host, port=args.port)
+    if args.profile:
+        from blackjack.profiling import profile
+
+        with profile(args.profile_output):
+            run(args)
+    else:
+        run(args)
+
+
+def run(args):
+    policy = 'table' if args.policy_table and not args.policy else args.policy
+    if args.compile_table:
+        from blackjack.compiler import compile_policy
+        from blackjack.solver import save_table
+
+        save_table(args.compile_table, compile_policy(get_policy(
+            policy, host=args.host, port=args.port, policy_table=args.policy_table,
+            timeout=args.timeout, retries=args.retries,
+        )))
+    elif args.local and args.sessions > 1:
+        from blackjack.host import run_local_host
+
+        run_local_host(
+            args.sessions, args.episodes, args.policy or 'random_conservative',
+            concurrency=args.session_concurrency,
+        )
+    elif args.local:
+        from blackjack.runner import load_test
+
+        load_test(
+            args.instances, args.episodes, args.policy or 'random_conservative'
+        )
     elif args.generate_chart:
-        generate_chart(args.host, args.port)
+        generate_chart(
+            args.host, args.port, policy_table=args.policy_table,
+            timeout=args.timeout, retries=args.retries,
+        )
+    elif args.compare:
+        from blackjack.compare import compare_policies
+
+        names = args.compare.split(',')
+        for name in names:
+            if name not in AVAILABLE_POLICIES and name != 'table':
+                parser.error(f'Unknown policy {name} in --compare.')
+        compare_policies(
+            args.episodes, names, host=args.host, port=args.port, seed=args.seed,
+            report_every=args.report_every, policy_table=args.policy_table,
+            timeout=args.timeout, retries=args.retries,
+        )
+    elif policy and args.exact:
+        from blackjack.exact import evaluate_exact
+
+        print(f'Using {policy} policy.')
+        print(evaluate_exact(
+            get_policy(policy, host=args.host, port=args.port,
+                       policy_table=args.policy_table),
+            decks=args.decks or None,
+        ))
+    elif policy:
+        evaluate_policy(
+            args.episodes, policy, host=args.host, port=args.port,
+            workers=args.workers, seed=args.seed, concurrency=args.concurrency,
+            cache_file=args.cache_file, cache_size=args.cache_size,
+            report_every=args.report_every, target_stderr=args.target_stderr,
+            record=args.record, policy_table=args.policy_table,
+            timeout=args.timeout, retries=args.retries,
+        )
+    elif args.instances > 1:
+        from blackjack.runner import supervise
+
+        argv = ['--verbose'] if args.verbose else []
+        for name, value in vars(args).items():
+            if name.startswith('log_') and value != parser.get_default(name):
+                option = '--' + name.replace('_', '-')
+                argv += [option] if value is True else [option, str(value)]
+        if args.sessions > 1:
+            argv += ['--sessions', str(args.sessions)]
+        if args.session_concurrency:
+            argv += ['--session-concurrency', str(args.session_concurrency)]
+        supervise(args.instances, argv)
+    elif args.sessions > 1:
+        from blackjack.host import run_host
+
+        with open_event_log(args) as event_log:
+            run_host(
+                args.sessions, args.session_concurrency, args.verbose, event_log
+            )
     else:
-        run_interface(args.verbose)
+        run_interface(args.verbose, open_event_log(args))
 
 
 if __name__ == '__main__':
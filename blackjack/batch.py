@@ -0,0 +1,201 @@
+"""
+Vectorized engine playing many games of Blackjack in lockstep.
+
+Games are stored as integer arrays instead of ``Card`` and ``Hand`` objects,
+so that a single call to ``step`` advances every game at once. The rules are
+the same of ``Blackjack.step`` and ``Blackjack.finalize_game``, except that
+hands cannot be split: ``split`` is always masked and halts the game.
+"""
+import numpy as np
+
+from blackjack.blackjack import FRENCH_DECK
+from blackjack.solver import TABLE_SHAPE
+from blackjack.stats import RewardStats
+
+HALTED = -2
+PLAY = -1
+LOST = 0
+DRAW = 1
+WON = 2
+
+DECK_VALUES = np.array([card.rank_numeric for card in FRENCH_DECK], dtype=np.int8)
+
+
+class BatchBlackjack:
+    """
+    Play ``n`` games of blackjack at the same time.
+
+    Each row of ``deck`` is the order in which cards are dealt in one game,
+    ``cursor`` points to the next card to deal. Hands are stored as hard
+    totals, where aces count as 1, plus the number of aces they contain.
+    """
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def reset(self, n):
+        """Start ``n`` new games and return their state."""
+        self.deck = np.tile(DECK_VALUES, (n, 1))
+        self.cursor = np.zeros(n, dtype=np.intp)
+        self.player = np.zeros(n, dtype=np.int16)
+        self.player_aces = np.zeros(n, dtype=np.int8)
+        self.dealer = np.zeros(n, dtype=np.int16)
+        self.dealer_aces = np.zeros(n, dtype=np.int8)
+        self.double = np.zeros(n, dtype=bool)
+        self.surrender = np.zeros(n, dtype=bool)
+        self.first_step = np.ones(n, dtype=bool)
+        self.result = np.full(n, PLAY, dtype=np.int8)
+        self.deal(np.arange(n))
+        return self.state
+
+    def deal(self, rows):
+        """Start new games in ``rows`` with freshly shuffled decks."""
+        self.deck[rows] = self.rng.permuted(self.deck[rows], axis=1)
+        self.cursor[rows] = 0
+        for array in (self.player, self.player_aces, self.dealer, self.dealer_aces):
+            array[rows] = 0
+        self.double[rows] = False
+        self.surrender[rows] = False
+        self.first_step[rows] = True
+        self.result[rows] = PLAY
+
+        self._draw(self.player, self.player_aces, rows)
+        self._draw(self.player, self.player_aces, rows)
+        self._draw(self.dealer, self.dealer_aces, rows)
+
+    def _draw(self, totals, aces, rows):
+        """Deal one card to the hands in ``rows``."""
+        values = self.deck[rows, self.cursor[rows]]
+        self.cursor[rows] += 1
+        is_ace = values == 11
+        totals[rows] += np.where(is_ace, 1, values)
+        aces[rows] += is_ace
+
+    @staticmethod
+    def _value(totals, aces):
+        soft = totals + 10
+        return np.where((aces > 0) & (soft <= 21), soft, totals)
+
+    @property
+    def player_value(self):
+        return self._value(self.player, self.player_aces)
+
+    @property
+    def player_soft(self):
+        return (self.player_aces > 0) & (self.player <= 11)
+
+    @property
+    def dealer_value(self):
+        return self._value(self.dealer, self.dealer_aces)
+
+    @property
+    def done(self):
+        return self.result != PLAY
+
+    def get_mask(self):
+        mask = np.ones((len(self.result), 5), dtype=np.int8)
+        mask[:, 2] = self.first_step
+        mask[:, 4] = 0
+        return mask
+
+    @property
+    def state(self):
+        return {
+            'player': self.player_value,
+            'dealer': self.dealer_value,
+            'double': self.double.copy(),
+            'player_ace': (self.player_aces > 0).astype(np.int8),
+            'player_soft': self.player_soft.astype(np.int8),
+            'dealer_ace': (self.dealer_aces > 0).astype(np.int8),
+            'surrender': self.surrender.copy(),
+            'split': np.zeros(len(self.result), dtype=np.int8),
+            'mask': self.get_mask(),
+            'result': self.result.copy(),
+        }
+
+    def finalize_game(self, rows):
+        """Let the dealer play the games in ``rows`` and compare hands."""
+        pending = rows
+        while len(pending):
+            pending = pending[self._value(self.dealer, self.dealer_aces)[pending] < 17]
+            self._draw(self.dealer, self.dealer_aces, pending)
+
+        player = self.player_value[rows]
+        dealer = self.dealer_value[rows]
+        self.result[rows] = np.where(
+            (player > dealer) | (dealer > 21),
+            WON,
+            np.where(player == dealer, DRAW, LOST),
+        )
+
+    def step(self, actions):
+        """
+        Apply ``actions`` to every game still being played and return the state.
+
+        Actions use the same encoding of ``action_mapping``. Games that are
+        already over ignore their action. Games receiving an invalid action,
+        like ``double`` after the first step, are halted.
+        """
+        actions = np.asarray(actions)
+        playing = self.result == PLAY
+
+        halt = playing & (
+            (actions < 0) | (actions > 3) | ((actions == 2) & ~self.first_step)
+        )
+        self.result[halt] = HALTED
+        playing &= ~halt
+
+        hit = playing & (actions == 1)
+        double = playing & (actions == 2)
+        stay = playing & (actions == 0)
+        surrender = playing & (actions == 3)
+
+        self.double[double] = True
+        picked = np.flatnonzero(hit | double)
+        self._draw(self.player, self.player_aces, picked)
+        bust = np.zeros_like(playing)
+        bust[picked] = self.player_value[picked] > 21
+        self.result[bust] = LOST
+
+        self.surrender[surrender] = True
+        self.result[surrender] = LOST
+
+        self.finalize_game(np.flatnonzero(stay | (double & ~bust)))
+        self.first_step[hit & ~bust] = False
+        return self.state
+
+
+def play_table(table, n_games, seed=None, batch_size=100_000) -> RewardStats:
+    """
+    Play ``n_games`` with the actions of a flat policy ``table`` and count
+    their final results, see ``blackjack.compiler``.
+
+    Games are played ``batch_size`` at a time. Hands are not split, they are
+    hit like by ``TablePolicy`` when splitting is not allowed, and games
+    halted by other invalid actions are counted in ``halted``.
+    """
+    actions = np.asarray(table, dtype=np.int8).reshape(TABLE_SHAPE)
+    actions = np.where(actions == 4, 1, actions).astype(np.int8)
+    game = BatchBlackjack(seed)
+    results = RewardStats()
+    for start in range(0, n_games, batch_size):
+        game.reset(min(batch_size, n_games - start))
+        while not game.done.all():
+            # Finished games ignore their action, whatever their totals
+            player = np.minimum(game.player_value, 21)
+            dealer = np.minimum(game.dealer_value, 11)
+            game.step(actions[
+                game.first_step.astype(np.intp), game.player_soft.astype(np.intp),
+                player, dealer,
+            ])
+        finished = game.result != HALTED
+        results.halted += int((~finished).sum())
+        keys, counts = np.unique(
+            np.stack([
+                game.result[finished], game.double[finished], game.surrender[finished]
+            ], axis=1),
+            axis=0, return_counts=True,
+        )
+        for (result, double, surrender), count in zip(keys.tolist(), counts.tolist()):
+            results[(result, bool(double), bool(surrender))] += count
+    return results
@@ -3,8 +3,10 @@ Simulation of Blackjack.
 
 This is a simplified version of blackjack with the following features:
 
-- Cards are picked from a french deck of size 52. The deck is refreshed at each
-  episode.
+- Cards are picked from a shoe of 1 to 8 french decks of size 52. The shoe is
+  kept across episodes and reshuffled when a new episode starts after the cut
+  card has been reached. By default the shoe holds one deck and is reshuffled
+  at each episode.
 - At the first hand the player is given two cards and the dealer one
 - At each step the player chooses whether to ``stay``, ``hit``, ``double`` or
   ``surrender``.
@@ -12,36 +14,64 @@ This is a simplified version of blackjack with the following features:
 - The player can choose ``hit`` until the sum of cards is higher than 21,
   in that case the player loses (busts).
 - If the player ``surrenders`` the game ends and the player loses only half of
-  the bet.
+  the bet. The player cannot surrender after splitting.
 - If the player chooses to ``double``, one card is added to its hand and the
   game continues as if he selects ``stay``. In case the player wins, the reward
-  should be higher than for a normal win.
+  should be higher than for a normal win. Doubling is only allowed as the
+  first action on a hand.
+- If the first two cards of a hand have the same value the player can
+  ``split`` them into two hands, played one after the other, see
+  ``Blackjack``.
 - When the player ``stays`` the dealer picks cards until reaching a 17, and the
   value of player and dealer hands are compared
 - Who has a hand closer to 21 wins the game, if both have the same value the
   game is a draw
-
-TODO: Forbid choosing ``double`` after first move.
-TODO: Reuse same deck for multiple hands + make deck closer to casino game (2 decks...)
-TODO: Split when first two cards are pair (need action masking)
 """
-import dataclasses
-import itertools
+import enum
+import functools
 import json
+import logging
 import random
 import reprlib
 import time
-import traceback
 from pathlib import Path
-from typing import Iterable, List
+from typing import Iterable, List, NamedTuple
+
+logger = logging.getLogger(__name__)
 
-from bonsai_connector.connector import BonsaiEventType
+RANK_VALUES = {
+    **{str(n): n for n in range(2, 11)},
+    'J': 10,
+    'Q': 10,
+    'K': 10,
+    'A': 11,
+}
 
 
-@dataclasses.dataclass
 class Card:
-    rank: str
-    suit: str
+    """
+    A playing card.
+
+    Cards are interned: building a card with the same rank and suit always
+    returns the same object, and its numeric value is looked up only once.
+    """
+    __slots__ = ('rank', 'suit', 'rank_numeric')
+    _interned = {}
+
+    def __new__(cls, rank: str, suit: str):
+        card = cls._interned.get((rank, suit))
+        if card is None:
+            if rank not in RANK_VALUES:
+                raise ValueError(f'Rank {rank} unknown.')
+            card = super().__new__(cls)
+            card.rank = rank
+            card.suit = suit
+            card.rank_numeric = RANK_VALUES[rank]
+            cls._interned[(rank, suit)] = card
+        return card
+
+    def __reduce__(self):
+        return Card, (self.rank, self.suit)
 
     def __repr__(self):
         return f"Card({self.rank!r}, {self.suit!r})"
@@ -49,33 +79,94 @@ class Card:
     def __str__(self):
         return f"Card({self.rank}, {self.suit})"
 
-    @property
-    def rank_numeric(self):
-        """Return the numeric value of the card."""
-        if self.rank in list('JQK'):
-            return 10
-        elif self.rank.isdigit():
-            return int(self.rank)
-        elif self.rank == 'A':
-            return 11
-        else:
-            raise ValueError(f'Rank {self.rank} unknown.')
-
 
 class Deck:
     ranks = [str(n) for n in range(2, 11)] + list('JQKA')
     suits = '♠ ♥ ♦ ♣'.split()
 
     def __init__(self):
-        self.cards = [
-            Card(rank, suit) for suit in self.suits for rank in self.ranks
-        ]
+        self.cards = list(FRENCH_DECK)
         random.shuffle(self.cards)
 
     def pick(self, n=1) -> List[Card]:
         return [self.cards.pop() for i in range(n)]
 
 
+FRENCH_DECK = tuple(Card(rank, suit) for suit in Deck.suits for rank in Deck.ranks)
+
+
+class Shoe:
+    """
+    Cards of ``decks`` french decks dealt across several games.
+
+    Cards are dealt by moving a cursor over a preallocated list, and are only
+    shuffled as they are dealt: ``pick`` swaps a card drawn at random among
+    those left to the cursor, one step of a Fisher-Yates shuffle, so that
+    shuffling costs nothing and a game only randomizes the cards it deals.
+    Cards are drawn with ``rng``, the ``random`` module by default. The cut
+    card is placed after a fraction ``penetration`` of the cards: once it has
+    been reached, ``start_game`` reshuffles before the next game. A shoe
+    running out during a game is reshuffled without the cards in play.
+    """
+    def __init__(self, decks=1, penetration=0.0, rng=None):
+        if not 1 <= decks <= 8:
+            raise ValueError(f'Shoe must contain from 1 to 8 decks, got {decks}.')
+        if not 0 <= penetration <= 1:
+            raise ValueError(f'Penetration must be between 0 and 1, got {penetration}.')
+        self.decks = decks
+        self.penetration = penetration
+        self.rng = random if rng is None else rng
+        self.cards = list(FRENCH_DECK) * decks
+        self.cut = int(len(self.cards) * penetration)
+        self.shuffle()
+
+    def __len__(self):
+        """Return the number of cards left before the end of the shoe."""
+        return len(self.cards) - self.cursor
+
+    @property
+    def needs_shuffle(self) -> bool:
+        return self.cursor >= self.cut
+
+    def shuffle(self):
+        # Dealt cards are put back, they are shuffled again by ``pick``
+        self.cursor = 0
+        self.game_start = 0
+
+    def start_game(self):
+        """Reshuffle if the cut card was reached, cards dealt next are in play."""
+        if self.needs_shuffle:
+            self.shuffle()
+        self.game_start = self.cursor
+
+    def pick(self, n=1) -> List[Card]:
+        # Only a penetration close to 1 can exhaust the shoe during a game, the
+        # cards in play are then moved first and the others put back
+        if n > len(self):
+            cards = self.cards
+            start, cursor = self.game_start, self.cursor
+            cards[:cursor] = cards[start:cursor] + cards[:start]
+            self.cursor = cursor - start
+            self.game_start = 0
+        cards = self.cards
+        start = self.cursor
+        rand = self.rng.random
+        n_cards = len(cards)
+        for i in range(start, start + n):
+            j = i + int(rand() * (n_cards - i))
+            cards[i], cards[j] = cards[j], cards[i]
+        self.cursor = start + n
+        return cards[start:start + n]
+
+
+class Outcome(enum.IntEnum):
+    """Outcome of a game, encoded like ``result`` in the simulator state."""
+    PLAY = -1
+    LOST = 0
+    DRAW = 1
+    WON = 2
+
+
 class GameLostException(Exception):
     pass
 
@@ -93,11 +184,27 @@ class GameSurrenderException(Exception):
 
 
 class Hand:
+    """
+    Cards held by a player.
+
+    The hand keeps a running hard total, where aces count as 1, and the number
+    of aces, so that its value is known without scanning the cards.
+    """
     def __init__(self, cards: Iterable[Card]):
-        self.cards = list(cards)
+        self.cards = []
+        self.hard = 0
+        self.aces = 0
+        self.add(cards)
 
     def add(self, cards: Iterable[Card]):
-        self.cards.extend(cards)
+        for card in cards:
+            value = card.rank_numeric
+            if value == 11:
+                self.aces += 1
+                self.hard += 1
+            else:
+                self.hard += value
+            self.cards.append(card)
 
     def __len__(self):
         return len(self.cards)
@@ -109,11 +216,12 @@ class Hand:
         return str(self.cards)
 
     def has_ace(self):
-        return self.has_rank('A')
+        return self.aces > 0
 
     def has_rank(self, rank):
         """Return True if ``rank`` is present in hand."""
-        return any(card.rank == str(rank) for card in self.cards)
+        rank = str(rank)
+        return any(card.rank == rank for card in self.cards)
 
     def has_rank_between(self, min_rank, max_rank):
         """Return True if hand has at least one card with rank between min and max."""
@@ -123,6 +231,11 @@ class Hand:
         """Return True if hand is composed exactly by ``ranks``."""
         return all(self.has_rank(rank) for rank in ranks) and len(ranks) == len(self)
 
+    @property
+    def is_soft(self) -> bool:
+        """Return True if an ace is counted as 11."""
+        return self.aces > 0 and self.hard <= 11
+
     @property
     def value(self) -> int:
         """
@@ -134,59 +247,91 @@ class Hand:
         For example, in case of 2 aces the value is 12, in case of 2
         figures and 1 ace the value is 21.
         """
-        aces = 0
-        cumulative = 0
-        for card in self.cards:
-            if card.rank_numeric == 11:
-                aces += 1
-            else:
-                cumulative += card.rank_numeric
-        if aces:
-            sums = []
-            min_overflow = None
-            for comb in itertools.combinations([1, 11] * aces, aces):
-                distance = 21 - sum(comb) - cumulative
-                if distance >= 0:
-                    sums.append(distance)
-                elif min_overflow is None or distance > min_overflow:
-                    min_overflow = distance
-            if sums:
-                return 21 - min(sums)
-            elif min_overflow:
-                return 21 - min_overflow
-            else:
-                raise RuntimeError('Impossible to determine hand value.')
-        return cumulative
+        if self.aces and self.hard <= 11:
+            return self.hard + 10
+        return self.hard
+
+
+class Observation(NamedTuple):
+    """
+    Typed view of a game for local policies.
+
+    ``player`` is the value of the player hand, ``soft`` whether an ace counts
+    as 11, ``pair`` whether the player holds two cards of the same value,
+    ``upcard`` the value of the dealer card and ``first_step`` whether the
+    player has not acted yet.
+    """
+    player: int
+    soft: bool
+    pair: bool
+    upcard: int
+    first_step: bool
+
+
+MAX_HANDS = 4
 
 
 class Blackjack:
+    """
+    A game of blackjack between a player and the dealer.
+
+    The player may split pairs into up to ``MAX_HANDS`` hands, played one
+    after the other. Only the hand being played is a ``Hand``, the first card
+    of each split hand waiting to be played and the value, double and result
+    of every hand are kept in lists of ``MAX_HANDS`` slots, so that the cost
+    of a step does not depend on the number of hands. ``double`` tells
+    whether the first hand was doubled. Split aces receive one
+    card each and cannot be split again.
+    """
     double: bool = False
     surrender: bool = False
 
-    def __init__(self):
-        self.deck = Deck()
+    def __init__(self, deck=None):
+        self.deck = Deck() if deck is None else deck
         self.player_hand = Hand(self.deck.pick(2))
         self.dealer_hand = Hand(self.deck.pick())
         self.first_step = True
+        self.hand = 0
+        self.n_hands = 1
+        self.split_aces = False
+        self.hand_cards = [None] * MAX_HANDS
+        self.hand_values = [0] * MAX_HANDS
+        self.hand_doubles = [False] * MAX_HANDS
+        self.hand_results = [Outcome.PLAY] * MAX_HANDS
+
+    @property
+    def can_split(self) -> bool:
+        cards = self.player_hand.cards
+        return (
+            len(cards) == 2 and cards[0].rank_numeric == cards[1].rank_numeric and
+            self.n_hands < MAX_HANDS and not self.split_aces
+        )
 
     def get_mask(self):
-        if self.first_step:
-            return [1, 1, 1]
-        return [1, 1, 0]
+        # Shared lists, as masks are only read
+        if not self.first_step and self.n_hands == 1:
+            return MASK_NEXT_STEPS
+        return MASKS[self.first_step, self.n_hands == 1, self.can_split]
 
     @property
     def state(self):
-        return {
-            'player': self.player_hand.value,
-            'dealer': self.dealer_hand.value,
-            'double': self.double,
-            'player_ace': int(self.player_hand.has_ace()),
-            'dealer_ace': int(self.dealer_hand.has_ace()),
-            'player_hand': str(self.player_hand),
-            'dealer_hand': str(self.dealer_hand),
-            'surrender': self.surrender,
-            'mask': self.get_mask()
-        }
+        """Return every field of ``STATE_FIELDS``."""
+        return self.observe(STATE_FIELDS)
+
+    @property
+    def observation(self) -> Observation:
+        cards = self.player_hand.cards
+        return Observation(
+            self.player_hand.value,
+            self.player_hand.is_soft,
+            len(cards) == 2 and cards[0].rank_numeric == cards[1].rank_numeric,
+            self.dealer_hand.value,
+            self.first_step,
+        )
+
+    def observe(self, fields):
+        """Return a state made only of ``fields``, see ``STATE_FIELDS``."""
+        return {field: STATE_FIELDS[field](self) for field in fields}
 
     def win(self):
         raise GameWonException(
@@ -200,74 +345,255 @@ class Blackjack:
             f' against {self.dealer_hand.value}',
         )
 
-    def finalize_game(self):
-        """Run this function when no other player action is possible."""
-        if self.surrender:
-            raise GameSurrenderException('Player surrendered')
-
-        while self.dealer_hand.value < 17:
-            self.dealer_hand.add(self.deck.pick())
-        player = self.player_hand.value
-        dealer = self.dealer_hand.value
-        if player > dealer or dealer > 21:
+    def raise_outcome(self, outcome):
+        """Raise the exception corresponding to a finished game."""
+        if outcome == Outcome.WON:
             self.win()
-        elif player == dealer:
+        elif outcome == Outcome.DRAW:
             raise GameDrawException(
-                f'Draw with {player}'
+                f'Draw with {self.player_hand.value}'
             )
-        else:
+        elif outcome == Outcome.LOST:
+            if self.surrender:
+                raise GameSurrenderException('Player surrendered')
             self.lose()
 
-    def player_pick(self):
+    def dealer_play(self) -> Outcome:
+        """
+        Let the dealer pick cards and compare the hands.
+
+        The dealer only picks cards if a hand did not bust. The outcome of a
+        split game is won or lost if the total reward of its hands is positive
+        or negative.
+        """
+        values = self.hand_values
+        values[self.hand] = self.player_hand.value
+        if self.surrender:
+            self.hand_results[0] = Outcome.LOST
+            return Outcome.LOST
+
+        if any(values[i] <= 21 for i in range(self.n_hands)):
+            while self.dealer_hand.value < 17:
+                self.dealer_hand.add(self.deck.pick())
+        dealer = self.dealer_hand.value
+        balance = 0
+        for i in range(self.n_hands):
+            player = values[i]
+            if player > 21:
+                result = Outcome.LOST
+            elif player > dealer or dealer > 21:
+                result = Outcome.WON
+            elif player == dealer:
+                result = Outcome.DRAW
+            else:
+                result = Outcome.LOST
+            self.hand_results[i] = result
+            balance += (int(result) - 1) * (2 if self.hand_doubles[i] else 1)
+
+        if self.n_hands == 1:
+            return self.hand_results[0]
+        if balance > 0:
+            return Outcome.WON
+        elif balance == 0:
+            return Outcome.DRAW
+        return Outcome.LOST
+
+    def finalize_game(self):
+        """Run this function when no other player action is possible."""
+        self.raise_outcome(self.dealer_play())
+
+    def pick(self) -> Outcome:
+        """Give a card to the player, who loses if the hand goes over 21."""
         self.player_hand.add(self.deck.pick())
         if self.player_hand.value > 21:
-            self.lose()
+            return Outcome.LOST
+        return Outcome.PLAY
 
-    def step(self, action):
+    def player_pick(self):
+        self.raise_outcome(self.pick())
+
+    def split(self) -> Outcome:
+        """Split the pair of the current hand, the second card starts a new hand."""
+        first, second = self.player_hand.cards
+        self.hand_cards[self.n_hands] = second
+        self.n_hands += 1
+        self.split_aces = first.rank_numeric == 11
+        self.player_hand = Hand([first, *self.deck.pick()])
+        self.first_step = True
+        if self.split_aces:
+            return self.finish_hand()
+        return Outcome.PLAY
+
+    def finish_hand(self) -> Outcome:
+        """Move to the next split hand, or let the dealer play after the last one."""
+        while self.hand + 1 < self.n_hands:
+            self.hand_values[self.hand] = self.player_hand.value
+            self.hand += 1
+            self.player_hand = Hand([self.hand_cards[self.hand], *self.deck.pick()])
+            self.first_step = True
+            # Split aces receive a single card
+            if not self.split_aces:
+                return Outcome.PLAY
+        return self.dealer_play()
+
+    def play(self, action) -> Outcome:
+        """
+        Apply ``action`` and return the outcome of the game.
+
+        Unlike ``step`` this never raises when the game ends, the final
+        result is returned instead.
+        """
         if action == 'hit':
-            self.player_pick()
+            if self.pick() == Outcome.PLAY:
+                self.first_step = False
+                return Outcome.PLAY
         elif action == 'double':
             if not self.first_step:
                 raise RuntimeError('Can only double-down at first step')
-            self.double = True
-            self.player_pick()
-            self.finalize_game()
-        elif action == 'stay':
-            self.finalize_game()
+            self.hand_doubles[self.hand] = True
+            if self.hand == 0:
+                self.double = True
+            self.pick()
         elif action == 'surrender':
+            if self.n_hands > 1:
+                raise RuntimeError('Can only surrender before splitting')
             self.surrender = True
-            self.finalize_game()
-        self.first_step = False
+        elif action == 'split':
+            if not self.can_split:
+                raise RuntimeError('Can only split pairs')
+            return self.split()
+        elif action != 'stay':
+            self.first_step = False
+            return Outcome.PLAY
+        return self.finish_hand()
 
+    def step(self, action):
+        """Apply ``action`` and raise a ``Game*Exception`` if the game ends."""
+        self.raise_outcome(self.play(action))
+
+
+# Masks of the actions in ``action_mapping``, by first step, whether the
+# player may surrender and whether the player may split
+MASKS = {
+    (first_step, surrender, split): [
+        1, 1, int(first_step), int(surrender), int(split)
+    ]
+    for first_step in (False, True)
+    for surrender in (False, True)
+    for split in (False, True)
+}
+MASK_NEXT_STEPS = MASKS[False, True, False]
+
+# Functions computing each field of ``Blackjack.state``
+STATE_FIELDS = {
+    'player': lambda game: game.player_hand.value,
+    'dealer': lambda game: game.dealer_hand.value,
+    'double': lambda game: game.double,
+    'player_ace': lambda game: int(game.player_hand.has_ace()),
+    'player_soft': lambda game: int(game.player_hand.is_soft),
+    'dealer_ace': lambda game: int(game.dealer_hand.has_ace()),
+    'player_hand': lambda game: str(game.player_hand),
+    'dealer_hand': lambda game: str(game.dealer_hand),
+    'surrender': lambda game: game.surrender,
+    'split': lambda game: game.n_hands - 1,
+    'hand_results': lambda game: game.hand_results[:],
+    'hand_doubles': lambda game: game.hand_doubles[:],
+    'mask': Blackjack.get_mask,
+    'observation': lambda game: game.observation,
+}
 
 action_mapping = {
     0: 'stay',
     1: 'hit',
     2: 'double',
     3: 'surrender',
+    4: 'split',
 }
 
 
+@functools.lru_cache(maxsize=None)
+def load_interface():
+    """
+    Return the interface declared in ``blackjack-interface.json``.
+
+    The file is parsed once per process and the interface is shared, it must
+    not be modified.
+    """
+    with open(Path(__file__).parent / 'blackjack-interface.json', 'r') as fp:
+        return json.load(fp)
+
+
+def interface_fields(interface) -> tuple:
+    """Return the names of the state fields declared in ``interface``."""
+    return tuple(field['name'] for field in interface['description']['state']['fields'])
+
+
 class SimulatorModel:
-    def __init__(self):
-        with open(Path(__file__).parent / 'blackjack-interface.json', 'r') as fp:
-            self.interface = json.load(fp)
+    """
+    Simulator driven by the Bonsai platform or by local evaluations.
+
+    When ``fields`` is given, states only contain ``result`` and those fields,
+    so that consumers do not pay for fields they never read.
+    """
+    def __init__(self, fields=None):
+        self.interface = load_interface()
+        self.shoe = None
+        # Seeded from the ``random`` module, so that seeding it still gives
+        # reproducible games
+        self.rng = random.Random(random.getrandbits(64))
+        self.seed = None
+        if fields is not None:
+            fields = tuple(field for field in fields if field != 'result')
+        self.fields = fields
+
+    def get_state(self, result, **extra):
+        if self.fields is None:
+            state = self.blackjack.state
+        else:
+            state = self.blackjack.observe(self.fields)
+        return {'result': result, **extra, **state}
+
+    def get_shoe(self, config) -> Shoe:
+        """Return the shoe for a new episode, reshuffled if needed."""
+        decks = int(config.get('decks', 1))
+        penetration = config.get('penetration', 0.0)
+        if self.shoe is None or (
+            (self.shoe.decks, self.shoe.penetration) != (decks, penetration)
+        ):
+            self.shoe = Shoe(decks, penetration, self.rng)
+        else:
+            self.shoe.start_game()
+        return self.shoe
 
     def reset(self, config):
-        self.blackjack = Blackjack()
-        return {
-            'result': -1,
-            **self.blackjack.state
-        }
+        """
+        Start a new episode.
+
+        ``config`` may set the number of ``decks`` in the shoe, the
+        ``penetration`` of the cut card and the ``seed`` of the cards. The
+        generator is only seeded when the seed changes, with a new shoe, so
+        that episodes sharing a config do not replay the same cards.
+        """
+        config = config or {}
+        seed = config.get('seed')
+        if seed is not None and seed != self.seed:
+            self.rng.seed(seed)
+            self.seed = seed
+            self.shoe = None
+        self.blackjack = Blackjack(self.get_shoe(config))
+        return self.get_state(-1)
 
     def dispatch_event(self, next_event):
-        if next_event.event_type == BonsaiEventType.EPISODE_START:
+        # Compared by name, so that the connector is not imported in the loop
+        # and local evaluations do not need it
+        event_name = next_event.event_type.name
+        if event_name == 'EPISODE_START':
             return self.reset(next_event.event_content)
-        elif next_event.event_type == BonsaiEventType.EPISODE_STEP:
+        elif event_name == 'EPISODE_STEP':
             return self.step(next_event.event_content)
-        elif next_event.event_type == BonsaiEventType.EPISODE_FINISH:
+        elif event_name == 'EPISODE_FINISH':
             return {'reason': next_event.event_content}
-        elif next_event.event_type == BonsaiEventType.IDLE:
+        elif event_name == 'IDLE':
             return
         else:
             raise RuntimeError(
@@ -276,36 +602,8 @@ class SimulatorModel:
 
     def step(self, action):
         try:
-            self.blackjack.step(action_mapping[action['command']])
-            return {
-                'result': -1,
-                **self.blackjack.state
-            }
-        except GameLostException:
-            return {
-                'result': 0,
-                **self.blackjack.state,
-            }
-        except GameDrawException:
-            return {
-                'result': 1,
-                **self.blackjack.state,
-            }
-        except GameWonException:
-            return {
-                'result': 2,
-                **self.blackjack.state,
-            }
-        except GameSurrenderException:
-            return {
-                'result': 0,
-                **self.blackjack.state,
-            }
+            outcome = self.blackjack.play(action_mapping[action['command']])
         except Exception:
-            print('Exception raised.')
-            traceback.print_exc()
-            return {
-                'result': -2,
-                'halted': True,
-                **self.blackjack.state,
-            }
+            logger.exception('Exception raised.')
+            return self.get_state(-2, halted=True)
+        return self.get_state(int(outcome))
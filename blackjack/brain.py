@@ -0,0 +1,98 @@
+"""
+Client of a brain deployed with Bonsai.
+
+``BrainClient`` keeps its connections alive in a pooled ``requests.Session``,
+retries requests that fail on connection errors or server errors and gives up
+after ``timeout`` seconds. ``play_concurrently`` plays games on a pool of
+threads, each waiting for at most one prediction at a time, so that the
+number of requests in flight is bounded by ``concurrency``.
+"""
+import concurrent.futures
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from blackjack.stats import RewardStats
+
+
+class BrainClient:
+    """Request predictions to the brain served at ``host:port``."""
+
+    def __init__(self, host, port, *, timeout=10, retries=3, pool_size=10):
+        self.base_url = f'http://{host}:{port}'
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.1,
+            status_forcelist=(500, 502, 503, 504),
+            # Predictions do not change the brain, they are safe to repeat
+            allowed_methods=frozenset({'POST'}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def predict(self, client_id, state):
+        """Return the prediction of the brain for ``state``."""
+        response = self.session.post(
+            f'{self.base_url}/v2/clients/{client_id}/predict',
+            json={'state': state},
+            timeout=self.timeout,
+        )
+        if response.status_code != 200:
+            raise ValueError(response.content)
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+def play_concurrently(
+    n_games, make_policy, concurrency, *, report_every=None, target_stderr=None,
+    batch_size=100,
+) -> RewardStats:
+    """
+    Play ``n_games`` on ``concurrency`` threads and count their final results.
+
+    ``make_policy`` is called once per thread, so that every thread has its
+    own policy, e.g. a ``BrainPolicy`` with its own client id. Threads take
+    games in batches of ``batch_size``; progress is printed every
+    ``report_every`` games and the target standard error checked after every
+    batch.
+    """
+    from blackjack.policies import make_model, play_games
+
+    results = RewardStats()
+    lock = threading.Lock()
+    stop = threading.Event()
+    remaining = n_games
+    next_report = report_every
+
+    def play():
+        nonlocal remaining, next_report
+        policy = make_policy()
+        model = make_model(policy)
+        while not stop.is_set():
+            with lock:
+                batch = min(batch_size, remaining)
+                remaining -= batch
+            if not batch:
+                return
+            counts = play_games(batch, policy, model)
+            with lock:
+                results.update(counts)
+                if report_every and results.n >= next_report:
+                    next_report = results.n + report_every
+                    print(f'{results.n} games: {results}')
+                if results.reached(target_stderr):
+                    stop.set()
+
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+        futures = [executor.submit(play) for _ in range(concurrency)]
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+    return results
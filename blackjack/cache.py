@@ -0,0 +1,92 @@
+"""
+Memoize the decisions of deterministic policies.
+
+The action of a deterministic policy depends only on a few state fields, and
+blackjack has only a few hundred distinct observable states, so most
+decisions can be answered without calling the policy, e.g. without a network
+round trip to a deployed brain.
+"""
+import collections
+import json
+import threading
+from pathlib import Path
+
+from blackjack.policies import Policy
+
+
+def _freeze(value):
+    """Turn lists, e.g. masks, into tuples so that they can be used as keys."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class DecisionCache:
+    """
+    Least recently used mapping of observed states to actions.
+
+    The cache keeps at most ``maxsize`` actions and counts its hits and misses.
+    It can be shared by the policies of several threads.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.actions = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.actions)
+
+    def get(self, key):
+        """Return the action stored for ``key``, or None."""
+        with self._lock:
+            action = self.actions.get(key)
+            if action is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.actions.move_to_end(key)
+            return action
+
+    def put(self, key, action):
+        with self._lock:
+            self.actions[key] = action
+            self.actions.move_to_end(key)
+            if len(self.actions) > self.maxsize:
+                self.actions.popitem(last=False)
+
+    def load(self, path):
+        """Add the actions saved in ``path``, if it exists."""
+        if not Path(path).exists():
+            return
+        with open(path, 'r') as fp:
+            for key, action in json.load(fp):
+                self.put(_freeze(key), action)
+
+    def save(self, path):
+        with self._lock:
+            items = list(self.actions.items())
+        with open(path, 'w') as fp:
+            json.dump(items, fp)
+
+
+class CachedPolicy(Policy):
+    """Answer from ``cache`` the states already seen by a deterministic ``policy``."""
+    deterministic = True
+
+    def __init__(self, policy: Policy, cache: DecisionCache = None):
+        if not policy.deterministic or policy.observed_fields is None:
+            raise ValueError(f'{type(policy).__name__} is not deterministic.')
+        self.policy = policy
+        self.cache = DecisionCache() if cache is None else cache
+        self.observed_fields = policy.observed_fields
+
+    def step(self, state):
+        key = tuple(_freeze(state[field]) for field in self.observed_fields)
+        action = self.cache.get(key)
+        if action is None:
+            action = self.policy.step(state)
+            self.cache.put(key, action)
+        return action
@@ -0,0 +1,126 @@
+"""
+Compare policies on the same games.
+
+Every episode is dealt from a generator seeded from the master seed and the
+episode index, so that all policies are dealt the same cards in the same
+order: the cards drawn only differ once their actions do. The difference
+between the rewards of two policies is counted by episode, and its standard
+error is much lower than the one of the difference of two independent
+evaluations, as the luck of the deal cancels out. Differences are broken down
+by the starting state of the episodes, which tells where policies disagree.
+"""
+import collections
+import math
+import random
+
+from blackjack.policies import (
+    get_policy, get_reward, make_model, play_game, reward_key,
+)
+from blackjack.stats import Z_95, DifferenceStats, RewardStats
+
+
+def play_episode(policy, model, config):
+    """
+    Play an episode started with ``config``, return its starting state, as
+    ``(player, soft, pair, upcard)``, and its ``get_reward`` key, None if the
+    episode was given up by ``play_game``.
+    """
+    state = model.reset(config)
+    start = model.blackjack.observation[:4]
+    state = play_game(policy, model, state)
+    if state['result'] == -2:
+        return start, None
+    return start, reward_key(state)
+
+
+def report(name, baseline, results, differences, by_state, top):
+    """Print the difference between two policies and its largest contributions."""
+    independent = math.hypot(results[name].stderr, results[baseline].stderr)
+    print(
+        f'{name} - {baseline}: {differences}, '
+        f'± {Z_95 * independent:.5f} with independent evaluations'
+    )
+    total = sum(diff * count for diff, count in differences.items())
+    contributions = {
+        start: sum(diff * count for diff, count in stats.items())
+        for start, stats in by_state.items()
+    }
+    print(f'Largest differences by starting state, {name} - {baseline}:')
+    print('| player | soft | pair | dealer | games | difference | share |')
+    print('|---|---|---|---|---|---|---|')
+    for start in sorted(contributions, key=lambda s: abs(contributions[s]),
+                        reverse=True)[:top]:
+        if not contributions[start]:
+            break
+        stats = by_state[start]
+        share = contributions[start] / total if total else math.nan
+        print(
+            '| {} | {} | {} | {} | {} | {:.4f} ± {:.4f} | {:.1%} |'.format(
+                *start, stats.n, stats.mean, Z_95 * stats.stderr, share,
+            )
+        )
+
+
+def compare_policies(
+    n_games, policy_names, host, port, *, seed=None, report_every=None, top=10,
+    **brain_options,
+):
+    """
+    Play ``n_games`` with each of ``policy_names`` on the same cards.
+
+    The rewards of every policy, and their paired differences with the first
+    policy, are printed with the starting states where the differences are
+    the largest. Returns the ``RewardStats`` of every policy and the
+    ``DifferenceStats`` of every policy after the first.
+    """
+    if 'player' in policy_names:
+        raise ValueError('Interactive policies cannot be compared.')
+    if len(policy_names) < 2:
+        raise ValueError('At least two policies are needed for a comparison.')
+    if seed is None:
+        seed = random.randrange(2**32)
+    print(f'Comparing {", ".join(policy_names)} with seed {seed}.')
+
+    policies = [
+        get_policy(name, host=host, port=port, **brain_options) for name in policy_names
+    ]
+    models = [make_model(policy) for policy in policies]
+    results = {name: RewardStats() for name in policy_names}
+    baseline, *others = policy_names
+    differences = {name: DifferenceStats() for name in others}
+    by_state = {name: collections.defaultdict(DifferenceStats) for name in others}
+
+    halted = 0
+    for game in range(1, n_games + 1):
+        config = {'seed': f'{seed}-{game}'}
+        keys = []
+        for policy, model in zip(policies, models):
+            # Starting states are the same for all policies
+            start, key = play_episode(policy, model, config)
+            keys.append(key)
+        # Games given up by any policy are left out of the comparison
+        if None in keys:
+            halted += 1
+            for name, key in zip(policy_names, keys):
+                if key is None:
+                    results[name].halted += 1
+        else:
+            rewards = []
+            for name, key in zip(policy_names, keys):
+                results[name][key] += 1
+                rewards.append(get_reward(key))
+            for name, reward in zip(others, rewards[1:]):
+                difference = reward - rewards[0]
+                differences[name][difference] += 1
+                by_state[name][start][difference] += 1
+        if report_every and game % report_every == 0:
+            for name in others:
+                print(f'{game} games: {name} - {baseline}: {differences[name]}')
+
+    if halted:
+        print(f'{halted} games halted by invalid actions were left out.')
+    for name in policy_names:
+        print(f'{name}: {results[name]}')
+    for name in others:
+        report(name, baseline, results, differences[name], by_state[name], top)
+    return results, differences
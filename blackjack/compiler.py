@@ -0,0 +1,112 @@
+"""
+Compile policies into flat action tables.
+
+The decision of a deterministic policy in a live game mostly depends on the
+player total, whether the player hand is soft, the dealer upcard and whether
+it is the first step: a few hundred states. ``compile_policy`` plays a
+representative game for every reachable state, queries the policy once per
+state and stores the actions in a flat list laid out like the strategy table
+of ``blackjack.solver``, so that tables are saved and loaded with
+``save_table`` and ``load_table``.
+
+``blackjack.policies.TablePolicy`` answers with a single lookup, and the
+games of ``BatchBlackjack`` are played from a table by
+``blackjack.batch.play_table``. Unreachable states, such as a hard 4 after
+the first step, are set to ``stay``.
+
+Tables have no pair axis: representative games are pairs only when every
+two-card hand of their total is a pair, like a hard 4, and splits are only
+stored for these totals, as a non-pair looking up a split would halt its
+game. Other splits are stored as ``hit``, and ``TablePolicy`` hits when a
+split is not allowed, e.g. once the player holds ``MAX_HANDS`` hands.
+"""
+import functools
+import itertools
+
+from blackjack.blackjack import Blackjack, Card, Hand, STATE_FIELDS
+from blackjack.policies import Policy
+from blackjack.solver import TABLE_SHAPE, table_index
+
+# Ranks tried when building hands, aces last so that hard totals are built
+# without aces whenever possible
+RANKS = [str(n) for n in range(10, 1, -1)] + ['A']
+UPCARD_RANKS = {value: str(value) for value in range(2, 11)}
+UPCARD_RANKS[11] = 'A'
+
+
+class _FixedDeck:
+    """Deal ``cards`` in the given order."""
+
+    def __init__(self, cards):
+        self.cards = list(reversed(cards))
+
+    def pick(self, n=1):
+        return [self.cards.pop() for _ in range(n)]
+
+
+@functools.lru_cache(maxsize=None)
+def representative_ranks(total: int, soft: bool, n_cards: int):
+    """Return ranks of ``n_cards`` cards making a hand of ``total``, or None."""
+    for ranks in (RANKS[:-1], RANKS):
+        for combo in itertools.product(ranks, repeat=n_cards):
+            hand = Hand([Card(rank, '♠') for rank in combo])
+            if hand.value == total and hand.is_soft == soft:
+                return combo
+    return None
+
+
+def representative_game(player: int, soft: bool, upcard: int, first_step: bool):
+    """Return a game in the given state, or None if the state is unreachable."""
+    ranks = representative_ranks(player, soft, 2 if first_step else 3)
+    if ranks is None:
+        return None
+    cards = [Card(rank, '♠') for rank in ranks]
+    cards.insert(2, Card(UPCARD_RANKS[upcard], '♥'))
+    game = Blackjack(_FixedDeck(cards))
+    if not first_step:
+        game.play('hit')
+    return game
+
+
+@functools.lru_cache(maxsize=None)
+def only_pairs(total: int, soft: bool) -> bool:
+    """Return True if hands of two cards make ``total`` and are all pairs."""
+    hands = [
+        hand for hand in (
+            Hand([Card(first, '♠'), Card(second, '♠')])
+            for first, second in itertools.combinations_with_replacement(RANKS, 2)
+        )
+        if hand.value == total and hand.is_soft == soft
+    ]
+    return bool(hands) and all(
+        hand.cards[0].rank_numeric == hand.cards[1].rank_numeric for hand in hands
+    )
+
+
+def reachable_states():
+    """Yield the states of a live game as ``(player, soft, upcard, first_step)``."""
+    for first_step in (False, True):
+        for soft in (False, True):
+            for player in range(4, 22):
+                for upcard in range(2, 12):
+                    if representative_ranks(player, soft, 2 if first_step else 3):
+                        yield player, soft, upcard, first_step
+
+
+def compile_policy(policy: Policy):
+    """Return the action of ``policy`` in every state, laid out like ``solve``."""
+    if not policy.deterministic:
+        raise ValueError(f'{type(policy).__name__} is not deterministic.')
+    fields = policy.observed_fields
+    if fields is None:
+        fields = tuple(STATE_FIELDS)
+    actions = [0] * functools.reduce(int.__mul__, TABLE_SHAPE)
+    for state in reachable_states():
+        game = representative_game(*state)
+        observation = {'result': -1, **game.observe(fields)}
+        action = int(policy.step(observation)['command'])
+        player, soft, _, first_step = state
+        if action == 4 and not (first_step and only_pairs(player, soft)):
+            action = 1
+        actions[table_index(*state)] = action
+    return actions
@@ -0,0 +1,130 @@
+"""
+Vectorized environments to train and evaluate agents locally.
+
+Both environments expose the same Gym-style API:
+
+- ``reset()`` returns ``(observations, info)``
+- ``step(actions)`` returns ``(observations, rewards, dones, info)``
+
+Observations are ``float32`` arrays with one row per environment and one
+column per numeric state field declared in ``blackjack-interface.json``, in
+the same order (see ``OBSERVATION_FIELDS``). ``info['mask']`` holds the action
+masks of ``get_mask``. Finished episodes are reset automatically: the observations
+returned by ``step`` belong to the new episodes, while the last observations
+of the finished ones are in ``info['final_observation']``. Episodes halted by
+an invalid action are done with reward 0 and flagged in ``info['halted']``.
+
+``VectorEnv`` steps one ``SimulatorModel`` per environment, whereas
+``BatchVectorEnv`` steps all environments at once with ``BatchBlackjack``.
+"""
+import numpy as np
+
+from blackjack.batch import HALTED, BatchBlackjack
+from blackjack.blackjack import SimulatorModel, load_interface
+from blackjack.policies import REWARD_FIELDS, get_reward, reward_key
+
+OBSERVATION_FIELDS = tuple(
+    field['name']
+    for field in load_interface()['description']['state']['fields']
+    if field['type']['category'] == 'Number'
+)
+
+# Rewards indexed by result, double and surrender
+REWARDS = np.array([
+    [[get_reward((result, double, surrender)) for surrender in (False, True)]
+     for double in (False, True)]
+    for result in range(3)
+], dtype=np.float32)
+
+
+class VectorEnv:
+    """Run ``n_envs`` instances of ``SimulatorModel`` side by side."""
+
+    def __init__(self, n_envs, config=None):
+        fields = OBSERVATION_FIELDS + ('mask', *REWARD_FIELDS)
+        self.models = [SimulatorModel(fields=fields) for _ in range(n_envs)]
+        self.config = config or {}
+
+    @staticmethod
+    def _observe(states):
+        observations = np.array(
+            [[state[field] for field in OBSERVATION_FIELDS] for state in states],
+            dtype=np.float32,
+        )
+        mask = np.array([state['mask'] for state in states], dtype=np.int8)
+        return observations, mask
+
+    def reset(self):
+        self.states = [model.reset(self.config) for model in self.models]
+        observations, mask = self._observe(self.states)
+        return observations, {'mask': mask}
+
+    def step(self, actions):
+        n_envs = len(self.models)
+        rewards = np.zeros(n_envs, dtype=np.float32)
+        dones = np.zeros(n_envs, dtype=bool)
+        halted = np.zeros(n_envs, dtype=bool)
+        final = []
+        for i, (model, action) in enumerate(zip(self.models, actions)):
+            state = model.step({'command': int(action)})
+            if state['result'] == -1:
+                self.states[i] = state
+                continue
+            dones[i] = True
+            if state['result'] == HALTED:
+                halted[i] = True
+            else:
+                rewards[i] = get_reward(reward_key(state))
+            final.append(state)
+            self.states[i] = model.reset(self.config)
+
+        observations, mask = self._observe(self.states)
+        final_observations = np.zeros_like(observations)
+        if final:
+            final_observations[dones] = self._observe(final)[0]
+        info = {
+            'mask': mask, 'halted': halted, 'final_observation': final_observations
+        }
+        return observations, rewards, dones, info
+
+
+class BatchVectorEnv:
+    """Run ``n_envs`` games in lockstep with ``BatchBlackjack``."""
+
+    def __init__(self, n_envs, seed=None):
+        self.n_envs = n_envs
+        self.game = BatchBlackjack(seed)
+
+    def _observe(self):
+        state = self.game.state
+        observations = np.stack(
+            [state[field] for field in OBSERVATION_FIELDS], axis=1
+        ).astype(np.float32)
+        return observations, state['mask']
+
+    def reset(self):
+        self.game.reset(self.n_envs)
+        observations, mask = self._observe()
+        return observations, {'mask': mask}
+
+    def step(self, actions):
+        game = self.game
+        game.step(actions)
+        dones = game.done
+        halted = game.result == HALTED
+        finished = dones & ~halted
+        rewards = np.zeros(self.n_envs, dtype=np.float32)
+        rewards[finished] = REWARDS[
+            game.result[finished],
+            game.double[finished].astype(np.intp),
+            game.surrender[finished].astype(np.intp),
+        ]
+
+        final_observations, _ = self._observe()
+        final_observations[~dones] = 0
+        game.deal(np.flatnonzero(dones))
+        observations, mask = self._observe()
+        info = {
+            'mask': mask, 'halted': halted, 'final_observation': final_observations
+        }
+        return observations, rewards, dones, info
@@ -0,0 +1,151 @@
+"""
+Buffered and sampled logging of the events of the simulator loop.
+
+``EventLog.log`` is called with every event dispatched to a simulator and the
+state it returned. Sampled events are only appended to a buffer, which a
+background thread formats and writes in batches every ``flush_interval``
+seconds, so that the loop never waits on formatting or output.
+
+``every`` keeps the events of one episode out of ``every`` of each session,
+and ``terminal`` only keeps the states ending a game, halted or not. Events
+are written as text lines, as ``python -m blackjack`` used to print them, or
+as JSON lines.
+With ``counters``, no event is written, but every ``counters`` seconds the
+number of episodes per second and the rates of the results of the games
+finished since the previous line.
+"""
+import collections
+import json
+import sys
+import threading
+import time
+
+RESULTS = {2: 'won', 1: 'draw', 0: 'lost', -2: 'halted'}
+
+
+class EventLog:
+    """
+    Write the sampled events logged by simulators to ``file``, a file object
+    or a path opened in append mode.
+
+    At most ``max_pending`` events wait to be written, further events are
+    dropped and counted in ``dropped``.
+    """
+
+    def __init__(
+        self, file=sys.stdout, *, every=1, terminal=False, json_lines=False,
+        counters=None, flush_interval=0.5, max_pending=100_000,
+    ):
+        self.owns_file = isinstance(file, str)
+        self.file = open(file, 'a') if self.owns_file else file
+        self.every = every
+        self.terminal = terminal
+        self.json_lines = json_lines
+        self.counters = counters
+        self.interval = counters or flush_interval
+        self.max_pending = max_pending
+        self.pending = collections.deque()
+        self.dropped = 0
+        # Counts of episodes and results, shared with the writer thread
+        self.lock = threading.Lock()
+        self.episodes = 0
+        self.results = collections.Counter()
+        # Episodes started by every session, and whether the current one is sampled
+        self.session_episodes = collections.Counter()
+        self.sampled = {}
+        self.last_report = (time.perf_counter(), 0, collections.Counter())
+        self.stopped = threading.Event()
+        self.writer = threading.Thread(target=self._run, daemon=True)
+        self.writer.start()
+
+    def log(self, event_type, state, session=None):
+        """Log the ``state`` returned by the simulator of ``session``."""
+        started = event_type.name == 'EPISODE_START'
+        if started:
+            episode = self.session_episodes[session]
+            self.session_episodes[session] = episode + 1
+            self.sampled[session] = episode % self.every == 0
+        result = -1 if state is None else state.get('result', -1)
+        if started or result != -1:
+            with self.lock:
+                self.episodes += started
+                if result != -1:
+                    self.results[result] += 1
+        if self.counters or (self.terminal and result == -1):
+            return
+        if not self.sampled.get(session, True):
+            return
+        if len(self.pending) < self.max_pending:
+            self.pending.append((time.time(), event_type, state, session))
+        else:
+            self.dropped += 1
+
+    def _format(self, timestamp, event_type, state, session):
+        if self.json_lines:
+            record = {'time': timestamp, 'event': event_type.name}
+            if session is not None:
+                record['session'] = session
+            record['state'] = state
+            return json.dumps(record, default=repr)
+        fields = [time.strftime('%H:%M:%S', time.localtime(timestamp))]
+        if session is not None:
+            fields.append(session)
+        return ' '.join([*fields, str(event_type), str(state)])
+
+    def _format_counters(self):
+        now = time.perf_counter()
+        last_time, last_episodes, last_results = self.last_report
+        with self.lock:
+            episodes = self.episodes
+            results = self.results.copy()
+        self.last_report = (now, episodes, results)
+        finished = results - last_results
+        games = sum(finished.values())
+        rates = {
+            name: finished[result] / games if games else 0.0
+            for result, name in RESULTS.items()
+        }
+        rate = (episodes - last_episodes) / (now - last_time)
+        if self.json_lines:
+            return json.dumps({
+                'time': time.time(), 'episodes': episodes,
+                'episodes_per_second': rate, **rates,
+            })
+        return (
+            f'{time.strftime("%H:%M:%S")} {episodes} episodes, {rate:.0f} '
+            f'episodes/s, '
+            + ', '.join(f'{name} {value:.1%}' for name, value in rates.items())
+        )
+
+    def flush(self):
+        """Write the pending events, or the counters."""
+        if self.counters:
+            lines = [self._format_counters()]
+        else:
+            lines = []
+            pending = self.pending
+            while pending:
+                lines.append(self._format(*pending.popleft()))
+        if lines:
+            self.file.write('\n'.join(lines) + '\n')
+            self.file.flush()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.flush()
+
+    def close(self):
+        """Stop the writer and write the events still pending."""
+        self.stopped.set()
+        self.writer.join()
+        self.flush()
+        if self.dropped:
+            print(f'{self.dropped} events dropped.', file=sys.stderr)
+        if self.owns_file:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,343 @@
+"""
+Exact evaluation of deterministic policies.
+
+The game tree of ``Blackjack`` is walked from every initial deal, weighting
+each card by its probability of being drawn from the cards left in the shoe,
+so that the outcomes of a policy, and its mean reward, are known without
+sampling. The shoe holds ``decks`` french decks freshly shuffled, which is the
+default configuration of ``SimulatorModel``, or is infinite like the shoe of
+``blackjack.solver`` when ``decks`` is None.
+
+Cards are only told apart by value, and a shoe is described by the number of
+cards left of each value. The final totals of the dealer are memoized by
+dealer hand and remaining cards, and the outcomes of the player by hand and
+remaining cards, so that games sharing a state are only played once. Policies
+are queried once per distinct observation, like ``blackjack.compiler``.
+
+Rewards of split games are the sum of the rewards of their hands, so that
+outcomes are counted by hand, as ``(result, double, surrender)`` keys of
+``get_reward``: the outcome of a finished hand only depends on its value and
+on the final total of the dealer, and the states of the game tree do not
+depend on the hands already finished. On a finite shoe, the cards of split
+games are drawn from the shoe as it was when the pair was split, and put
+back: following every composition of several hands does not fit in memory,
+while split games are rare enough for the mean reward to barely move.
+"""
+import functools
+
+from blackjack.blackjack import MASKS, MAX_HANDS, Observation, action_mapping
+from blackjack.policies import Policy, get_reward
+from blackjack.solver import BUST, add_card
+
+CARD_VALUES = tuple(range(2, 12))
+DECK_COMPOSITION = tuple(16 if value == 10 else 4 for value in CARD_VALUES)
+
+# Final totals of the dealer, in the order of ``dealer_outcomes``
+DEALER_TOTALS = (17, 18, 19, 20, 21, BUST)
+_FINAL_DEALER = {
+    total: tuple(float(total == final) for final in DEALER_TOTALS)
+    for total in DEALER_TOTALS
+}
+
+# Fields of the state that are known from the hand being played
+OBSERVABLE_FIELDS = frozenset(
+    ('player', 'player_soft', 'dealer', 'dealer_ace', 'mask', 'observation', 'split')
+)
+
+
+@functools.lru_cache(maxsize=None)
+def draws(shoe):
+    """
+    Return ``(value, probability, shoe)`` for each card that can be drawn from
+    ``shoe``, a tuple of the number of cards left by value. Cards drawn from a
+    shoe made of a single tuple of counts are put back.
+    """
+    if len(shoe) == 1:
+        counts, = shoe
+        n_cards = sum(counts)
+        return tuple(
+            (value, count / n_cards, shoe)
+            for value, count in zip(CARD_VALUES, counts) if count
+        )
+    n_cards = sum(shoe)
+    outcomes = []
+    for i, count in enumerate(shoe):
+        if count:
+            left = shoe[:i] + (count - 1,) + shoe[i + 1:]
+            outcomes.append((CARD_VALUES[i], count / n_cards, left))
+    return tuple(outcomes)
+
+
+@functools.lru_cache(maxsize=None)
+def dealer_outcomes(total: int, soft: bool, shoe) -> tuple:
+    """
+    Return the probabilities of the final dealer totals of ``DEALER_TOTALS``
+    when the dealer holds ``total`` and draws from ``shoe``.
+    """
+    if total >= 17:
+        return _FINAL_DEALER[min(total, BUST)]
+    probs = [0.0] * len(DEALER_TOTALS)
+    for card, prob, left in draws(shoe):
+        new_total, new_soft = add_card(total, soft, card)
+        if new_total >= 17:
+            # Final totals are added here, without hashing the shoe
+            probs[DEALER_TOTALS.index(min(new_total, BUST))] += prob
+            continue
+        for i, final_prob in enumerate(dealer_outcomes(new_total, new_soft, left)):
+            probs[i] += prob * final_prob
+    return tuple(probs)
+
+
+def final_value(total: int) -> int:
+    """
+    Return the value of a finished hand as compared with the dealer, who ends
+    with at least 17, so that hands with the same outcomes share their states.
+    """
+    if total > 21:
+        return BUST
+    return max(total, 16)
+
+
+def hand_outcomes(value: int, double: bool, dealer: tuple):
+    """Yield the key and probability of each outcome of a finished hand."""
+    if value == BUST:
+        yield (0, double, False), 1.0
+        return
+    # Totals of the dealer below ``value``, equal to it and above it
+    equal = value in DEALER_TOTALS
+    i = DEALER_TOTALS.index(value) if equal else 0
+    yield (2, double, False), dealer[-1] + sum(dealer[:i])
+    if equal:
+        yield (1, double, False), dealer[i]
+    yield (0, double, False), sum(dealer[i + equal:-1])
+
+
+def _accumulate(counts, other, weight=1.0):
+    for key, count in other:
+        counts[key] = counts.get(key, 0) + weight * count
+
+
+class OutcomeDistribution(dict):
+    """
+    Expected number of hands per game ending with each ``(result, double,
+    surrender)`` key, which are probabilities unless the policy splits.
+    ``split`` is the probability that a game is split, and ``exact`` whether
+    the outcomes are exact, i.e. unless split games were drawn from a finite
+    shoe with replacement.
+    """
+    split = 0.0
+    exact = True
+
+    @property
+    def mean(self) -> float:
+        return sum(get_reward(key) * count for key, count in self.items())
+
+    def count(self, predicate) -> float:
+        return sum(count for key, count in self.items() if predicate(key))
+
+    @property
+    def hands(self) -> float:
+        return sum(self.values())
+
+    @property
+    def won(self) -> float:
+        return self.count(lambda key: key[0] == 2)
+
+    @property
+    def draw(self) -> float:
+        return self.count(lambda key: key[0] == 1)
+
+    @property
+    def lost(self) -> float:
+        return self.count(lambda key: key[0] == 0)
+
+    @property
+    def double(self) -> float:
+        return self.count(lambda key: key[1])
+
+    @property
+    def surrender(self) -> float:
+        return self.count(lambda key: key[2])
+
+    def __str__(self):
+        return (
+            f'{self.mean:.5f} {"exactly" if self.exact else "approximately"} '
+            f'(hands per game: {self.won:.4f} won, '
+            f'{self.draw:.4f} draw, {self.lost:.4f} lost, {self.double:.4f} doubled, '
+            f'{self.surrender:.4f} surrendered, {self.split:.4f} games split)'
+        )
+
+
+class ExactEvaluator:
+    """
+    Play every game of a deterministic ``policy`` exactly.
+
+    Hands are described by their total, whether they are soft, the value of
+    their pair, if any, and whether it is the first step. Split games also
+    keep the number of hands, those waiting to be played and the value of the
+    split cards, which starts each of them. States are evaluated as the
+    probabilities of the final totals of the dealer and the expected counts
+    of the outcomes of the hands finished from there.
+    """
+
+    def __init__(self, policy: Policy):
+        fields = policy.observed_fields
+        if not policy.deterministic:
+            raise ValueError(f'{type(policy).__name__} is not deterministic.')
+        if fields is None or not OBSERVABLE_FIELDS.issuperset(fields):
+            raise ValueError(
+                f'{type(policy).__name__} observes fields that are not evaluated '
+                f'exactly, only {", ".join(sorted(OBSERVABLE_FIELDS))} are.'
+            )
+        self.policy = policy
+        self.actions = {}
+        self.states = {}
+        self.next_hands = {}
+
+    def decide(self, observation: Observation, n_hands: int, split_card: int) -> str:
+        """Return the action of the policy, which must be allowed by the mask."""
+        key = observation, n_hands, split_card
+        action = self.actions.get(key)
+        if action is None:
+            can_split = (
+                observation.pair and n_hands < MAX_HANDS and split_card != 11
+            )
+            mask = MASKS[observation.first_step, n_hands == 1, can_split]
+            command = self.policy.step({
+                'result': -1,
+                'player': observation.player,
+                'player_soft': int(observation.soft),
+                'dealer': observation.upcard,
+                'dealer_ace': int(observation.upcard == 11),
+                'mask': mask,
+                'observation': observation,
+                'split': n_hands - 1,
+            })['command']
+            if not mask[command]:
+                raise ValueError(
+                    f'{type(self.policy).__name__} chose {action_mapping[command]} '
+                    f'in {observation}, which is not allowed.'
+                )
+            action = self.actions[key] = action_mapping[command]
+        return action
+
+    def play(self, shoe, upcard, hand, n_hands=1, pending=0, split_card=0):
+        """
+        Return the probabilities of the final dealer totals and the expected
+        counts of the outcomes when the player holds ``hand``, as ``(total,
+        soft, pair, first_step)``, and ``shoe`` is left.
+        """
+        key = shoe, upcard, hand, n_hands, pending, split_card
+        evaluation = self.states.get(key)
+        if evaluation is None:
+            evaluation = self.states[key] = self._play(*key)
+        return evaluation
+
+    def _play(self, shoe, upcard, hand, n_hands, pending, split_card):
+        total, soft, pair, first_step = hand
+        observation = Observation(total, soft, bool(pair), upcard, first_step)
+        action = self.decide(observation, n_hands, split_card)
+        if action == 'stay':
+            return self.finish(
+                shoe, upcard, final_value(total), False, n_hands, pending, split_card
+            )
+        if action == 'surrender':
+            # Only single hands are surrendered, no other hand needs the dealer total
+            return _FINAL_DEALER[BUST], (((0, False, True), 1.0),)
+        if action == 'split':
+            # Both cards of the pair start a hand, the first one is played next
+            if len(shoe) > 1:
+                shoe = (shoe,)
+            return self.next_hand(shoe, upcard, n_hands + 1, pending + 2, pair)
+
+        dealer = [0.0] * len(DEALER_TOTALS)
+        counts = {}
+        for card, prob, left in draws(shoe):
+            new_total, new_soft = add_card(total, soft, card)
+            if action == 'double' or new_total > 21:
+                branch = self.finish(
+                    left, upcard, final_value(new_total), action == 'double',
+                    n_hands, pending, split_card,
+                )
+            else:
+                branch = self.play(
+                    left, upcard, (new_total, new_soft, 0, False),
+                    n_hands, pending, split_card,
+                )
+            for i, final_prob in enumerate(branch[0]):
+                dealer[i] += prob * final_prob
+            _accumulate(counts, branch[1], prob)
+        return tuple(dealer), tuple(counts.items())
+
+    def finish(self, shoe, upcard, value, double, n_hands, pending, split_card):
+        """Add the outcomes of a hand finished with ``value`` to the next ones."""
+        if value == BUST and n_hands == 1:
+            # The dealer does not play, and no other hand needs its total
+            return _FINAL_DEALER[BUST], (((0, double, False), 1.0),)
+        dealer, next_counts = self.next_hand(shoe, upcard, n_hands, pending, split_card)
+        counts = dict(next_counts)
+        _accumulate(counts, hand_outcomes(value, double, dealer))
+        return dealer, tuple(counts.items())
+
+    def next_hand(self, shoe, upcard, n_hands, pending, split_card):
+        """
+        Deal the second card of the next hand waiting to be played, or let the
+        dealer play once all hands are finished.
+        """
+        if not pending:
+            return dealer_outcomes(upcard, upcard == 11, shoe), ()
+        key = shoe, upcard, n_hands, pending, split_card
+        evaluation = self.next_hands.get(key)
+        if evaluation is not None:
+            return evaluation
+
+        dealer = [0.0] * len(DEALER_TOTALS)
+        counts = {}
+        for card, prob, left in draws(shoe):
+            total, soft = add_card(*add_card(0, False, split_card), card)
+            if split_card == 11:
+                # Split aces receive a single card
+                branch = self.finish(
+                    left, upcard, final_value(total), False, n_hands, pending - 1,
+                    split_card,
+                )
+            else:
+                hand = total, soft, split_card if card == split_card else 0, True
+                branch = self.play(left, upcard, hand, n_hands, pending - 1, split_card)
+            for i, final_prob in enumerate(branch[0]):
+                dealer[i] += prob * final_prob
+            _accumulate(counts, branch[1], prob)
+        evaluation = self.next_hands[key] = tuple(dealer), tuple(counts.items())
+        return evaluation
+
+    def evaluate(self, decks=1) -> OutcomeDistribution:
+        """
+        Return the outcomes of the games dealt from a shoe of ``decks`` decks,
+        or an infinite shoe if None.
+        """
+        if decks is None:
+            shoe = DECK_COMPOSITION,
+        else:
+            shoe = tuple(n * decks for n in DECK_COMPOSITION)
+        distribution = OutcomeDistribution()
+        # The player is dealt two cards and the dealer one, like ``Blackjack``
+        for first, first_prob, shoe_1 in draws(shoe):
+            for second, second_prob, shoe_2 in draws(shoe_1):
+                total, soft = add_card(*add_card(0, False, first), second)
+                hand = total, soft, first if first == second else 0, True
+                for upcard, upcard_prob, shoe_3 in draws(shoe_2):
+                    prob = first_prob * second_prob * upcard_prob
+                    _accumulate(distribution, self.play(shoe_3, upcard, hand)[1], prob)
+                    observation = Observation(total, soft, bool(hand[2]), upcard, True)
+                    if self.decide(observation, 1, 0) == 'split':
+                        distribution.split += prob
+        distribution.exact = decks is None or not distribution.split
+        return distribution
+
+
+def evaluate_exact(policy: Policy, decks=1) -> OutcomeDistribution:
+    """
+    Return the expected outcomes of the hands of ``policy`` on a freshly
+    shuffled shoe of ``decks`` decks, or an infinite shoe if None.
+    """
+    return ExactEvaluator(policy).evaluate(decks)
@@ -0,0 +1,213 @@
+"""
+Serve many simulator sessions from one process.
+
+``run_interface`` drives a single ``SimulatorModel`` and spends most of its
+time waiting on the platform. ``SimulatorHost`` runs ``n_sessions`` sessions,
+each with its own model and its own connector registered to the platform, as
+asyncio tasks. The blocking calls of the connectors run on a pool of
+``concurrency`` threads, which bounds how many round trips are in flight,
+while events are dispatched to the models on the event loop.
+
+Connectors are built for every session by a factory, ``BonsaiConnector`` when
+connected to the platform and ``blackjack.local.LocalConnector`` to run the
+host without it. A session ends when its connector is ``done`` or sends
+``UNREGISTER``, or when the host is stopped, e.g. by SIGINT or SIGTERM.
+"""
+import asyncio
+import collections
+import concurrent.futures
+import signal
+import sys
+import time
+
+from blackjack.blackjack import SimulatorModel, interface_fields, load_interface
+
+STOP_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+class SessionStats:
+    """Events received by a session and time spent waiting and simulating."""
+
+    def __init__(self):
+        self.events = collections.Counter()
+        self.halted = 0
+        self.wait_seconds = 0.0
+        self.sim_seconds = 0.0
+        self.error = None
+
+    @property
+    def episodes(self) -> int:
+        return self.events['EPISODE_START']
+
+    @property
+    def steps(self) -> int:
+        return self.events['EPISODE_STEP']
+
+    def __str__(self):
+        text = (
+            f'{self.episodes} episodes, {self.steps} steps, {self.halted} halted, '
+            f'{self.events["IDLE"]} idle, {self.wait_seconds:.2f}s waiting, '
+            f'{self.sim_seconds:.2f}s simulating'
+        )
+        if self.error is not None:
+            text += f', failed with {self.error}'
+        return text
+
+
+class Session:
+    """A simulator connected to the platform on its own."""
+
+    def __init__(self, session_id: str, connector, fields=None):
+        self.session_id = session_id
+        self.connector = connector
+        self.sim = SimulatorModel(fields=fields)
+        self.stats = SessionStats()
+
+
+class SimulatorHost:
+    """
+    Run ``n_sessions`` sessions with connectors built by ``connector_factory``
+    from the session id, at most ``concurrency`` waiting on their connector
+    at a time, by default all of them.
+
+    Models only compute ``fields``, by default those of the interface, and
+    events are logged to ``event_log``, a ``blackjack.eventlog.EventLog``.
+    """
+
+    def __init__(
+        self, connector_factory, n_sessions, *, concurrency=None, fields=None,
+        event_log=None,
+    ):
+        if fields is None:
+            fields = interface_fields(load_interface())
+        self.sessions = [
+            Session(session_id, connector_factory(session_id), fields)
+            for session_id in (f'session-{i}' for i in range(n_sessions))
+        ]
+        self.concurrency = concurrency or n_sessions
+        self.event_log = event_log
+        self.stopped = False
+
+    def stop(self):
+        """End every session after its current event."""
+        self.stopped = True
+
+    async def run(self):
+        """
+        Run all sessions until they end and return their stats by session id.
+        ``STOP_SIGNALS`` stop the host, so that sessions end after their event.
+        """
+        loop = asyncio.get_running_loop()
+        handled = []
+        for signum in STOP_SIGNALS:
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError, ValueError):
+                # Not supported on Windows nor outside of the main thread
+                continue
+            handled.append(signum)
+        try:
+            with concurrent.futures.ThreadPoolExecutor(self.concurrency) as executor:
+                await asyncio.gather(*(
+                    self.run_session(session, executor) for session in self.sessions
+                ))
+        finally:
+            for signum in handled:
+                loop.remove_signal_handler(signum)
+        return {session.session_id: session.stats for session in self.sessions}
+
+    async def run_session(self, session: Session, executor):
+        """Drive ``session`` with the events of its connector."""
+        # Imported here, as the connector is only needed when sessions run
+        from blackjack.local import clean_state
+
+        loop = asyncio.get_running_loop()
+        connector = session.connector
+        stats = session.stats
+        perf_counter = time.perf_counter
+        event_log = self.event_log
+        try:
+            await loop.run_in_executor(executor, connector.__enter__)
+            try:
+                state = None
+                while not self.stopped and not getattr(connector, 'done', False):
+                    if state is None:
+                        state = {'halted': False}
+                    start = perf_counter()
+                    event = await loop.run_in_executor(
+                        executor, connector.next_event, clean_state(state)
+                    )
+                    dispatched = perf_counter()
+                    stats.wait_seconds += dispatched - start
+                    stats.events[event.event_type.name] += 1
+                    if event.event_type.name == 'UNREGISTER':
+                        break
+                    state = session.sim.dispatch_event(event)
+                    stats.sim_seconds += perf_counter() - dispatched
+                    if state and state.get('halted'):
+                        stats.halted += 1
+                    if event_log is not None:
+                        event_log.log(event.event_type, state, session.session_id)
+            finally:
+                await loop.run_in_executor(
+                    executor, connector.__exit__, None, None, None
+                )
+        except Exception as exc:
+            # A failing session does not stop the others
+            stats.error = repr(exc)
+            print(f'{session.session_id} failed with {exc!r}', file=sys.stderr)
+
+    def report(self, file=sys.stdout):
+        """Print the stats of every session and their total."""
+        for session in self.sessions:
+            print(f'{session.session_id}: {session.stats}', file=file)
+        episodes = sum(session.stats.episodes for session in self.sessions)
+        steps = sum(session.stats.steps for session in self.sessions)
+        print(
+            f'Total: {episodes} episodes, {steps} steps on {len(self.sessions)} '
+            f'sessions', file=file,
+        )
+
+
+def run_host(n_sessions, concurrency=None, verbose=False, event_log=None):
+    """
+    Serve ``n_sessions`` sessions of the platform until interrupted, logging
+    their events to ``event_log``.
+    """
+    from bonsai_connector import BonsaiConnector
+
+    interface = load_interface()
+    host = SimulatorHost(
+        lambda session_id: BonsaiConnector(interface, verbose=verbose),
+        n_sessions, concurrency=concurrency, event_log=event_log,
+    )
+    asyncio.run(host.run())
+    host.report()
+
+
+def run_local_host(
+    n_sessions, n_episodes, policy_name, concurrency=None, latency=0.0,
+):
+    """
+    Play ``n_episodes`` on each of ``n_sessions`` sessions through the local
+    stand-in of ``blackjack.local``, with a round trip of ``latency`` seconds,
+    print the stats of the sessions and return the episodes per second.
+    """
+    from blackjack.local import LocalConnector
+    from blackjack.policies import get_policy
+
+    policy = get_policy(policy_name, host='localhost', port=5000)
+    fields = interface_fields(load_interface())
+    if policy.observed_fields is not None:
+        fields = tuple(dict.fromkeys((*fields, *policy.observed_fields)))
+    host = SimulatorHost(
+        lambda session_id: LocalConnector(policy, n_episodes, latency=latency),
+        n_sessions, concurrency=concurrency, fields=fields,
+    )
+    start = time.perf_counter()
+    asyncio.run(host.run())
+    seconds = time.perf_counter() - start
+    host.report()
+    episodes = sum(session.stats.episodes for session in host.sessions)
+    print(f'{episodes / seconds:.0f} episodes/s')
+    return episodes / seconds
@@ -0,0 +1,120 @@
+"""
+Local stand-in for the event loop of the Bonsai platform.
+
+``LocalConnector`` exposes the ``next_event`` method of ``BonsaiConnector``
+and answers every state with the event the platform would send next: an
+episode starts with ``EPISODE_START``, actions chosen by a local policy are
+sent with ``EPISODE_STEP`` until the game is over, and the episode ends with
+``EPISODE_FINISH``. ``IDLE`` events may be interleaved between episodes.
+
+``run_local`` drives a ``SimulatorModel`` with it, without network or
+printing in the loop, to measure how many episodes per second the simulator
+side of ``python -m blackjack`` sustains.
+"""
+import time
+from typing import NamedTuple
+
+from bonsai_connector.connector import BonsaiEventType
+
+from blackjack.blackjack import SimulatorModel, interface_fields, load_interface
+from blackjack.policies import Policy, get_policy
+
+
+class LocalEvent(NamedTuple):
+    event_type: BonsaiEventType
+    event_content: object = None
+
+
+def clean_state(state):
+    """Return the values of ``state`` that can be sent to the platform."""
+    allowed_types = (bool, dict, float, int, list)
+    return {key: val for key, val in state.items() if isinstance(val, allowed_types)}
+
+
+class LocalConnector:
+    """
+    Send the events of ``n_episodes`` episodes played by ``policy``.
+
+    Episodes start with ``config``, and an ``IDLE`` event is sent after every
+    ``idle_every`` episodes. Episodes halted by an invalid action are finished.
+    Every event is delayed by ``latency`` seconds, to stand in for the round
+    trip to the platform.
+    """
+
+    def __init__(
+        self, policy: Policy, n_episodes, config=None, idle_every=None, latency=0.0,
+    ):
+        self.policy = policy
+        self.n_episodes = n_episodes
+        self.config = config or {}
+        self.idle_every = idle_every
+        self.latency = latency
+        self.episodes = 0
+        self.steps = 0
+        self.in_episode = False
+        self.idle = False
+
+    @property
+    def done(self) -> bool:
+        return self.episodes >= self.n_episodes and not self.in_episode
+
+    def next_event(self, state) -> LocalEvent:
+        if self.latency:
+            time.sleep(self.latency)
+        if self.idle:
+            self.idle = False
+            return LocalEvent(BonsaiEventType.IDLE)
+        if not self.in_episode:
+            self.in_episode = True
+            return LocalEvent(BonsaiEventType.EPISODE_START, dict(self.config))
+
+        result = state['result']
+        if result == -1:
+            self.steps += 1
+            return LocalEvent(BonsaiEventType.EPISODE_STEP, self.policy.step(state))
+        self.in_episode = False
+        self.episodes += 1
+        self.idle = bool(self.idle_every) and self.episodes % self.idle_every == 0
+        reason = 'Halted' if result == -2 else 'Finished'
+        return LocalEvent(BonsaiEventType.EPISODE_FINISH, reason)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+def drive(sim: SimulatorModel, connector: LocalConnector) -> float:
+    """Dispatch the events of ``connector`` to ``sim`` and return the elapsed time."""
+    start = time.perf_counter()
+    state = None
+    while not connector.done:
+        if state is None:
+            state = {'halted': False}
+        event = connector.next_event(clean_state(state))
+        state = sim.dispatch_event(event)
+    return time.perf_counter() - start
+
+
+def run_local(n_episodes, policy_name, config=None, idle_every=None):
+    """
+    Play ``n_episodes`` through the local stand-in and return the throughput.
+
+    The simulator computes the fields of the interface, as when connected to
+    the platform, and those observed by the policy. Returns a dict with the
+    number of episodes, steps and seconds and the episodes per second.
+    """
+    policy = get_policy(policy_name, host='localhost', port=5000)
+    fields = interface_fields(load_interface())
+    if policy.observed_fields is not None:
+        fields = tuple(dict.fromkeys((*fields, *policy.observed_fields)))
+    sim = SimulatorModel(fields=fields)
+    connector = LocalConnector(policy, n_episodes, config, idle_every)
+    seconds = drive(sim, connector)
+    return {
+        'episodes': connector.episodes,
+        'steps': connector.steps,
+        'seconds': seconds,
+        'episodes_per_second': connector.episodes / seconds,
+    }
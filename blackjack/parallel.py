@@ -0,0 +1,71 @@
+"""
+Evaluate policies on many processes.
+
+Episodes are split in chunks of ``CHUNK_SIZE`` games. Every chunk seeds its
+own random stream from the master seed and the chunk index, so a chunk plays
+the same games regardless of the worker running it. Workers only send back a
+``RewardStats`` count of ``get_reward`` keys, which are
+merged in the parent process in chunk order, so that stopping early on a
+target standard error is reproducible as well.
+"""
+import multiprocessing
+import random
+
+from blackjack.policies import get_policy, make_model, play_games
+from blackjack.stats import RewardStats
+
+CHUNK_SIZE = 10_000
+
+
+def chunk_seed(seed, chunk):
+    """Return the seed of the random stream used by ``chunk``."""
+    return f'{seed}-{chunk}'
+
+
+def _play_chunk(args):
+    policy_name, host, port, brain_options, seed, chunk, n_games = args
+    random.seed(chunk_seed(seed, chunk))
+    policy = get_policy(policy_name, host=host, port=port, **brain_options)
+    return play_games(n_games, policy, make_model(policy))
+
+
+def evaluate_parallel(
+    n_games, policy_name: str, host: str, port: int, *, workers=1, seed=None,
+    report_every=None, target_stderr=None, **brain_options,
+) -> RewardStats:
+    """
+    Play ``n_games`` with ``policy_name`` on ``workers`` processes.
+
+    Progress is printed after every chunk once at least ``report_every`` more
+    games have been played, and the target standard error checked after every
+    chunk.
+    """
+    if policy_name == 'player':
+        raise ValueError('Interactive policies cannot be evaluated in chunks.')
+    if seed is None:
+        seed = random.randrange(2**32)
+        print(f'Using seed {seed}.')
+
+    chunks = [
+        (
+            policy_name, host, port, brain_options, seed, chunk,
+            min(CHUNK_SIZE, n_games - start),
+        )
+        for chunk, start in enumerate(range(0, n_games, CHUNK_SIZE))
+    ]
+    results = RewardStats()
+    next_report = report_every
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    imap = pool.imap if pool else map
+    try:
+        for counts in imap(_play_chunk, chunks):
+            results.update(counts)
+            if report_every and results.n >= next_report:
+                next_report = results.n + report_every
+                print(f'{results.n} games: {results}')
+            if results.reached(target_stderr):
+                break
+    finally:
+        if pool:
+            pool.terminate()
+    return results
@@ -1,20 +1,30 @@
 """Policies that can be evaluated in blackjack."""
 import collections
+import functools
 import itertools
 import random
 import string
 from abc import ABC, abstractmethod
 from collections.abc import Sequence
 
-import requests
+from blackjack.blackjack import Hand, SimulatorModel, action_mapping
+from blackjack.solver import TABLE_SHAPE, load_table, table_index
+from blackjack.stats import RewardStats
 
-from blackjack.blackjack import Card, Hand, SimulatorModel
-
-AVAILABLE_POLICIES = ['basic', 'brain', 'random', 'random_conservative', 'player']
+AVAILABLE_POLICIES = [
+    'basic', 'brain', 'optimal', 'random', 'random_conservative', 'player'
+]
 
 
 class Policy(ABC):
-    """Abstract Base Class representing a policy."""
+    """
+    Abstract Base Class representing a policy.
+
+    A policy is ``deterministic`` when its action depends only on the state
+    fields listed in ``observed_fields``.
+    """
+    deterministic = False
+    observed_fields = None
 
     @abstractmethod
     def step(self, state):
@@ -23,6 +33,8 @@ class Policy(ABC):
 
 class RandomPolicy(Policy):
     """Randomly select an action."""
+    observed_fields = ()
+
     def __init__(self, choices: Sequence):
         self.choices = choices
 
@@ -37,46 +49,130 @@ class PlayerPolicy(Policy):
     def step(self, state):
         print(state)
         action = -1
-        while action not in range(3):
+        while action not in action_mapping or not state['mask'][action]:
             try:
-                action = int(input('Select action: 0 (Stay), 1 (Hit), 2 (Double)'))
+                action = int(input(
+                    'Select action: 0 (Stay), 1 (Hit), 2 (Double), 3 (Surrender), '
+                    '4 (Split)'
+                ))
             except ValueError:
                 pass
         return {'command': int(action)}
 
 
-class BasicPolicy(Policy):
-    """Apply strategy from https://www.blackjackapprenticeship.com/blackjack-strategy-charts/."""  # noqa
+class TablePolicy(Policy):
+    """Look up actions in a flat table, see ``blackjack.compiler``."""
+    deterministic = True
+    observed_fields = ('player', 'player_soft', 'dealer', 'mask')
+
+    def __init__(self, table):
+        self.table = table
+        # Actions are shared, as they are only read
+        self.actions = {action: {'command': action} for action in action_mapping}
+
+    def step(self, state):
+        mask = state['mask']
+        # Double-down is only allowed, hence unmasked, at the first step
+        action = self.table[table_index(
+            state['player'], state['player_soft'], state['dealer'], mask[2]
+        )]
+        # Tables have no pair axis, so that a split or surrender may not be
+        # allowed in this hand, hit instead
+        if not mask[action]:
+            action = 1
+        return self.actions[action]
+
+
+class OptimalPolicy(TablePolicy):
+    """Choose the action with the highest expected reward, see ``blackjack.solver``."""
+
+    def __init__(self):
+        super().__init__(load_table())
+
+
+# Lowest dealer upcard against which soft totals of 13 to 17 are doubled
+SOFT_DOUBLE_UPCARDS = {13: 5, 14: 5, 15: 4, 16: 4, 17: 3}
+
+
+class BasicPolicy(TablePolicy):
+    """
+    Apply strategy from https://www.blackjackapprenticeship.com/blackjack-strategy-charts/.
+
+    The strategy is evaluated once per state of ``blackjack.compiler``, and
+    actions are looked up from the ``Observation`` of the game. Pairs are
+    split following ``split_matrix`` when the mask allows it.
+    """  # noqa
+    observed_fields = ('observation', 'mask')
+
+    def __init__(self):
+        super().__init__(self.decision_table())
+        self.splits = frozenset(
+            (pair, upcard)
+            for pair in range(2, 12) for upcard in range(2, 12)
+            if self.split_matrix(pair, upcard)
+        )
+
+    @staticmethod
+    def split_matrix(pair: int, upcard: int) -> bool:
+        """Return True if a pair of cards worth ``pair`` is split against ``upcard``."""
+        if pair in (8, 11):
+            return True
+        elif pair == 9:
+            return upcard in (2, 3, 4, 5, 6, 8, 9)
+        elif pair in (2, 3, 7):
+            return 2 <= upcard <= 7
+        elif pair == 6:
+            return 2 <= upcard <= 6
+        elif pair == 4:
+            return upcard in (5, 6)
+        return False
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def decision_table():
+        """Return the action of ``strategy_matrix`` in every state, see ``solve``."""
+        from blackjack.compiler import reachable_states, representative_game
+
+        actions = [0] * functools.reduce(int.__mul__, TABLE_SHAPE)
+        for state in reachable_states():
+            game = representative_game(*state)
+            action = BasicPolicy.strategy_matrix(
+                game.player_hand, game.dealer_hand, game.player_hand.has_ace(),
+                game.first_step,
+            )
+            actions[table_index(*state)] = action
+        return tuple(actions)
 
     @staticmethod
-    def strategy_matrix(player: Hand, dealer: Hand, player_ace: bool):
+    def strategy_matrix(
+        player: Hand, dealer: Hand, player_ace: bool, first_step: bool = True
+    ):
+        """
+        Return the action of the basic strategy. Double-down is only allowed
+        at the first step, later the hand hits, or stays on a soft 18 or 19.
+        """
+        upcard = dealer.value
+        # Soft hand, decided by its total whatever the number of cards
+        if player_ace and player.is_soft:
+            total = player.value
+            if total >= 20 or total == 19 and upcard != 6:
+                return 0
+            elif total >= 18 and upcard <= 6:
+                return 2 if first_step else 0
+            elif total == 18:
+                return 0 if upcard <= 8 else 1
+            # Soft 13 to 17 double against the weakest upcards
+            elif total >= 13 and SOFT_DOUBLE_UPCARDS[total] <= upcard <= 6:
+                return 2 if first_step else 1
+            else:
+                return 1
+
         # Surrender
         if (
             player.value == 16 and dealer.has_rank_between(9, 11) or
-            player.value == 15 and dealer.has_rank(10)
+            player.value == 15 and dealer.has_rank_between(10, 10)
         ):
             return 3
-
-        # Soft hand
-        if player_ace and len(player) < 3:
-            if player.has_rank(8) and dealer.is_ranks(6):
-                return 2
-            elif player.has_rank_between(8, 9):
-                return 0
-            elif player.has_rank(7) and dealer.has_rank_between(2, 6):
-                return 2
-            elif player.has_rank(7) and dealer.has_rank_between(7, 8):
-                return 0
-            elif (
-                player.has_rank(7) and dealer.has_rank_between(9, 11) or
-                player.has_rank(6) and dealer.is_ranks(2) or
-                player.has_rank_between(2, 5) and dealer.has_rank_between(2, 3) or
-                player.has_rank_between(2, 6) and dealer.has_rank_between(7, 11) or
-                player.has_rank_between(2, 3) and dealer.is_ranks(4)
-            ):
-                return 1
-            else:
-                return 2
         # Hard hand
         if (
             12 <= player.value <= 16 and dealer.has_rank_between(7, 11) or
@@ -91,22 +187,45 @@ class BasicPolicy(Policy):
             10 <= player.value <= 11 or
             player.value == 9 and dealer.has_rank_between(3, 6)
         ):
-            return 2
+            return 2 if first_step else 1
         else:
             return 1
 
     def step(self, state):
-        return {
-            'command': self.strategy_matrix(
-                state['player_hand'], state['dealer_hand'], state['player_ace']
-            )
-        }
+        observation = state['observation']
+        mask = state['mask']
+        if observation.pair and mask[4]:
+            # Aces are the only soft pair
+            pair = 11 if observation.soft else observation.player // 2
+            if (pair, observation.upcard) in self.splits:
+                return self.actions[4]
+        action = self.table[table_index(
+            observation.player, observation.soft, observation.upcard,
+            observation.first_step,
+        )]
+        # Surrender is not allowed after splitting, hit instead
+        if not mask[action]:
+            action = 1
+        return self.actions[action]
 
 
 class BrainPolicy(Policy):
-    """Poll actions from a deployed brain."""
-    def __init__(self, host, port, *, concept_name):
-        self.base_url = f'http://{host}:{port}'
+    """
+    Poll actions from a deployed brain.
+
+    The brain observes ``player_ace`` and ``split``, which are not keys of the
+    tables of ``blackjack.compiler``, so that a compiled brain may not play
+    exactly like the brain.
+    """
+    deterministic = True
+    observed_fields = ('player', 'dealer', 'player_ace', 'dealer_ace', 'split', 'mask')
+
+    def __init__(self, host, port, *, concept_name, client=None, **client_options):
+        if client is None:
+            from blackjack.brain import BrainClient
+
+            client = BrainClient(host, port, **client_options)
+        self.client = client
         # A client_id is important for keeping brain memory consistent
         # for the same client
         self.client_id = ''.join(
@@ -115,16 +234,20 @@ class BrainPolicy(Policy):
         self.concept = concept_name
 
     def step(self, state):
-        payload = {'state': state}
-        response = requests.post(
-            f'{self.base_url}/v2/clients/{self.client_id}/predict', json=payload
-        )
-        if response.status_code != 200:
-            raise ValueError(response.content)
-        return response.json()['concepts'][self.concept]['action']
+        prediction = self.client.predict(self.client_id, state)
+        return prediction['concepts'][self.concept]['action']
+
 
+def get_policy(
+    policy: str, host, port, *, policy_table=None, **brain_options
+) -> Policy:
+    """
+    Return the policy called ``policy``.
 
-def get_policy(policy: str, host, port) -> Policy:
+    The ``table`` policy looks up actions in the file ``policy_table``, see
+    ``blackjack.compiler``. ``brain_options``, like ``timeout`` and
+    ``retries``, are passed to the ``BrainClient`` of the ``brain`` policy.
+    """
     if policy == 'random':
         return RandomPolicy((0, 1, 2))
     elif policy == 'random_conservative':
@@ -133,13 +256,26 @@ def get_policy(policy: str, host, port) -> Policy:
         return PlayerPolicy()
     elif policy == 'basic':
         return BasicPolicy()
+    elif policy == 'optimal':
+        return OptimalPolicy()
+    elif policy == 'table':
+        if policy_table is None:
+            raise ValueError('The table policy needs a policy table file.')
+        return TablePolicy(load_table(policy_table))
     elif policy == 'brain':
-        return BrainPolicy(host, port, concept_name='PlayBlackjack')
+        return BrainPolicy(host, port, concept_name='PlayBlackjack', **brain_options)
     else:
         raise ValueError(f'Policy {policy} not found.')
 
 
 def get_reward(state):
+    """
+    Return the reward of a finished game.
+
+    ``state`` is a ``(result, double, surrender)`` tuple, followed in split
+    games by a ``(result, double)`` pair for every hand after the first, see
+    ``reward_key``.
+    """
     # TODO: reimplement with pattern matching on python 3.10
     reward_mapping = {
         # (Result, Double, Surrender): Reward
@@ -156,36 +292,202 @@ def get_reward(state):
         (2, True, True): 2,
         (2, True, False): 2,
     }
-    return reward_mapping[state]
+    if len(state) == 3:
+        return reward_mapping[state]
+    reward = reward_mapping[state[:3]]
+    for result, double in state[3:]:
+        reward += reward_mapping[(result, double, False)]
+    return reward
+
+
+def reward_key(state):
+    """Return the key of the final ``state`` of a game for ``get_reward``."""
+    split = state.get('split')
+    if not split:
+        return state['result'], state['double'], state['surrender']
+    results = state['hand_results']
+    doubles = state['hand_doubles']
+    return (
+        results[0], bool(doubles[0]), state['surrender'],
+        *((results[hand], bool(doubles[hand])) for hand in range(1, split + 1)),
+    )
 
 
 def get_mean_reward(results):
-    counter = collections.Counter(results)
+    """
+    Return the mean reward of ``results``.
+
+    ``results`` is either an iterable of ``get_reward`` keys or a ``Counter``
+    of them. Keys are summed in sorted order, so that equal
+    counts always give a bit-identical mean.
+    """
+    if isinstance(results, collections.Counter):
+        counter = results
+    else:
+        counter = collections.Counter(results)
     reward = 0
     total = 0
-    for elem, cnt in counter.items():
+    for elem in sorted(counter):
+        cnt = counter[elem]
         total += cnt
         reward += get_reward(elem) * cnt
     return reward / total
 
 
-def evaluate_policy(n_games, policy_name: str, host: str, port: int):
-    """Evaluate policy ``policy_name`` by playing ``n_games."""
-    policy = get_policy(policy_name, host=host, port=port)
-    print(f'Using {policy_name} policy.')
-
-    model = SimulatorModel()
-    results = []
-    for game in range(n_games):
-        state = model.reset({})
-        while state['result'] < 0:
-            state = model.step(policy.step(state))
-            if state['result'] >= 0:
-                results.append((state['result'], state['double'], state['surrender']))
+# State fields read by ``reward_key``
+REWARD_FIELDS = ('double', 'surrender', 'split', 'hand_results', 'hand_doubles')
+
+
+def make_model(policy: Policy, extra_fields=()) -> SimulatorModel:
+    """Return a model computing only the state fields needed to evaluate ``policy``."""
+    if policy.observed_fields is None:
+        return SimulatorModel()
+    return SimulatorModel(
+        fields=(*policy.observed_fields, *REWARD_FIELDS, *extra_fields)
+    )
+
+
+# Steps halted in a row before a game played by a policy is given up
+MAX_HALTED_STEPS = 10
+
+
+def play_game(policy: Policy, model: SimulatorModel, state, recorder=None):
+    """
+    Play the game started in ``state`` with ``policy`` and return its final
+    state, with result -2 if it was given up.
+
+    Steps halted by an invalid action are played again, as on the platform,
+    but a deterministic policy would choose the same action: its game is
+    given up at the first halted step, other games after ``MAX_HALTED_STEPS``
+    in a row. Steps are recorded by ``recorder``, see ``blackjack.replay``.
+    """
+    max_halted = 1 if policy.deterministic else MAX_HALTED_STEPS
+    halted = 0
+    while state['result'] < 0:
+        action = policy.step(state)
+        next_state = model.step(action)
+        if recorder is not None:
+            recorder.record(state, action['command'], next_state)
+        state = next_state
+        if state['result'] == -1:
+            halted = 0
+        elif state['result'] == -2:
+            halted += 1
+            if halted == max_halted:
+                if recorder is not None:
+                    recorder.end_episode()
+                break
+    return state
+
+
+def play_games(
+    n_games, policy: Policy, model: SimulatorModel, *, report_every=None,
+    target_stderr=None, recorder=None,
+) -> RewardStats:
+    """
+    Play ``n_games`` with ``policy`` and count their final results.
+
+    Every ``report_every`` games the running statistics are printed, and
+    games stop early once their standard error is below ``target_stderr``,
+    see ``RewardStats.reached``. Games given up by ``play_game`` are counted
+    in ``halted``. Steps are recorded by ``recorder``, see ``blackjack.replay``.
+    """
+    results = RewardStats()
+    for game in range(1, n_games + 1):
+        state = play_game(policy, model, model.reset({}), recorder)
+        if state['result'] >= 0:
+            results[reward_key(state)] += 1
+        else:
+            results.halted += 1
         if getattr(policy, 'print_state', False):
             print(state)
-    reward = get_mean_reward(results)
-    print(reward)
+        if report_every and game % report_every == 0:
+            print(f'{game} games: {results}')
+        # Checked every hundred games, as computing the standard error is slow
+        if target_stderr is not None and game % 100 == 0:
+            if results.reached(target_stderr):
+                break
+    return results
+
+
+def evaluate_policy(
+    n_games, policy_name: str, host: str, port: int, *, workers=1, seed=None,
+    concurrency=1, cache_file=None, cache_size=None, report_every=None,
+    target_stderr=None, record=None, **brain_options,
+):
+    """
+    Evaluate policy ``policy_name`` by playing ``n_games``.
+
+    Running statistics are printed every ``report_every`` games, and the
+    evaluation stops early once the standard error of the mean reward is
+    below ``target_stderr``.
+
+    When ``workers`` or ``seed`` are given, games are played in seeded chunks
+    by ``blackjack.parallel`` and the mean reward does not depend on the
+    number of workers. With ``concurrency``, games are played on as many
+    threads, which hides the latency of a remote brain.
+
+    With ``cache_size`` or ``cache_file``, decisions are memoized by
+    ``blackjack.cache.CachedPolicy`` and the cache is loaded from and saved
+    to ``cache_file``. With ``record``, the steps of serial evaluations are
+    appended to the replay in that directory, see ``blackjack.replay``.
+    """
+    print(f'Using {policy_name} policy.')
+    if record and (workers > 1 or seed is not None or concurrency > 1):
+        raise ValueError('Episodes can only be recorded by serial evaluations.')
+
+    cache = None
+    if cache_file or cache_size:
+        from blackjack.cache import CachedPolicy, DecisionCache
+
+        if workers > 1 or seed is not None:
+            raise ValueError('Decision cache cannot be used with seeded chunks.')
+        cache = DecisionCache(cache_size or 4096)
+        if cache_file:
+            cache.load(cache_file)
+
+    def make_policy():
+        policy = get_policy(policy_name, host=host, port=port, **brain_options)
+        if cache is not None:
+            return CachedPolicy(policy, cache)
+        return policy
+
+    if workers > 1 or seed is not None:
+        from blackjack.parallel import evaluate_parallel
+
+        results = evaluate_parallel(
+            n_games, policy_name, host=host, port=port, workers=workers, seed=seed,
+            report_every=report_every, target_stderr=target_stderr, **brain_options,
+        )
+    elif concurrency > 1:
+        from blackjack.brain import play_concurrently
+
+        results = play_concurrently(
+            n_games, make_policy, concurrency,
+            report_every=report_every, target_stderr=target_stderr,
+        )
+    elif record:
+        from blackjack.replay import RECORDED_FIELDS, EpisodeRecorder
+
+        policy = make_policy()
+        with EpisodeRecorder(record) as recorder:
+            results = play_games(
+                n_games, policy, make_model(policy, RECORDED_FIELDS),
+                report_every=report_every, target_stderr=target_stderr,
+                recorder=recorder,
+            )
+    else:
+        policy = make_policy()
+        results = play_games(
+            n_games, policy, make_model(policy),
+            report_every=report_every, target_stderr=target_stderr,
+        )
+    print(results)
+
+    if cache is not None:
+        print(f'Decision cache: {cache.hits} hits, {cache.misses} misses.')
+        if cache_file:
+            cache.save(cache_file)
 
 
 def _print_chart_header(title, cols, sep):
@@ -209,37 +511,33 @@ _command_to_action = {
 }
 
 
-def generate_chart(host, port):
+def generate_chart(host, port, policy_table=None, **client_options):
+    """
+    Print the strategy chart of the table in file ``policy_table``, or of the
+    deployed brain compiled into a table, see ``blackjack.compiler``.
+    """
+    if policy_table is None:
+        from blackjack.compiler import compile_policy
+
+        brain = BrainPolicy(host, port, concept_name='PlayBlackjack', **client_options)
+        table = compile_policy(brain)
+    else:
+        table = load_table(policy_table)
     sep = '\t|\t'
-    brain = BrainPolicy(host, port, concept_name='PlayBlackjack')
 
     _print_chart_header('Hard totals', range(2, 12), sep)
-
     for player in reversed(range(8, 18)):
         print('|', f'**{player}**', end=sep)
         for dealer in range(2, 12):
-            state = {
-                'player': player,
-                'dealer': dealer,
-                'player_ace': 0,
-                'dealer_ace': int(dealer == 11),
-            }
-            action = brain.step(state).get('command')
-            print(_command_to_action[int(action)], end=sep)
+            action = table[table_index(player, False, dealer, True)]
+            print(_command_to_action[action], end=sep)
         print()
     print()
 
     _print_chart_header('Soft totals', range(2, 12), sep)
     for card in reversed(range(2, 10)):
         print(f'| **A, {card}**', end=sep)
-        player_hand = Hand([Card('A', 'x'), Card(str(card), 'x')])
         for dealer in range(2, 12):
-            state = {
-                'player': player_hand.value,
-                'dealer': dealer,
-                'player_ace': int(player_hand.has_ace()),
-                'dealer_ace': int(dealer == 11),
-            }
-            action = brain.step(state).get('command')
-            print(_command_to_action[int(action)], end=sep)
+            action = table[table_index(11 + card, True, dealer, True)]
+            print(_command_to_action[action], end=sep)
         print()
@@ -0,0 +1,155 @@
+"""
+Optional instrumentation of the hot paths of the simulator.
+
+``Profiler.enable`` replaces the functions of every phase in ``PHASES`` with
+wrappers counting their calls and time, and ``disable`` puts the original
+functions back. Nothing is wrapped unless a profiler is enabled, so that the
+instrumentation costs nothing otherwise.
+
+Phases may be nested, e.g. ``step`` includes ``play`` and ``state``, so their
+times are inclusive and do not add up to the total. Only the current process
+is instrumented, games played by ``--workers`` are not.
+"""
+import collections
+import contextlib
+import cProfile
+import functools
+import importlib
+import inspect
+import pstats
+import sys
+import time
+
+from blackjack.policies import Policy
+
+# Phase name: (module, owner, attribute), where owner is None for functions and
+# may be an instance, such as the logger of the simulator
+PHASES = {
+    'deal': ('blackjack.blackjack', 'Shoe', 'pick'),
+    'hand_value': ('blackjack.blackjack', 'Hand', 'value'),
+    'play': ('blackjack.blackjack', 'Blackjack', 'play'),
+    'state': ('blackjack.blackjack', 'SimulatorModel', 'get_state'),
+    'reset': ('blackjack.blackjack', 'SimulatorModel', 'reset'),
+    'step': ('blackjack.blackjack', 'SimulatorModel', 'step'),
+    'exception': ('blackjack.blackjack', 'logger', 'exception'),
+    'connector': ('bonsai_connector.connector', 'BonsaiConnector', 'next_event'),
+    'local_connector': ('blackjack.local', 'LocalConnector', 'next_event'),
+    'event_log': ('blackjack.eventlog', 'EventLog', 'log'),
+}
+
+
+def _policy_classes(cls=Policy):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _policy_classes(subclass)
+
+
+class Profiler:
+    """Count the calls and time spent in every phase while enabled."""
+
+    def __init__(self):
+        self.calls = collections.Counter()
+        self.seconds = collections.defaultdict(float)
+        self.patches = []
+        self.elapsed = 0.0
+
+    def _timed(self, phase, func):
+        calls = self.calls
+        seconds = self.seconds
+        perf_counter = time.perf_counter
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds[phase] += perf_counter() - start
+                calls[phase] += 1
+        return wrapper
+
+    def instrument(self, owner, name, phase):
+        """Time the attribute ``name`` of ``owner``, maybe inherited, as ``phase``."""
+        original = inspect.getattr_static(owner, name)
+        if isinstance(original, property):
+            patched = property(self._timed(phase, original.fget))
+        elif not inspect.isclass(owner):
+            # Methods of instances are wrapped bound
+            patched = self._timed(phase, getattr(owner, name))
+        else:
+            patched = self._timed(phase, original)
+        inherited = name not in vars(owner)
+        setattr(owner, name, patched)
+        self.patches.append((owner, name, None if inherited else original))
+
+    def enable(self):
+        # Imported here, so that only available modules are instrumented
+        for phase, (module_name, owner_name, name) in PHASES.items():
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError:
+                continue
+            owner = module if owner_name is None else getattr(module, owner_name, None)
+            if owner is not None and hasattr(owner, name):
+                self.instrument(owner, name, phase)
+        for cls in _policy_classes():
+            if 'step' in vars(cls):
+                self.instrument(cls, 'step', 'policy')
+        self.start = time.perf_counter()
+
+    def disable(self):
+        self.elapsed += time.perf_counter() - self.start
+        while self.patches:
+            owner, name, original = self.patches.pop()
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def report(self, file=sys.stdout):
+        """Print the calls and inclusive time of every phase."""
+        print(
+            f'{"phase":>16} {"calls":>10} {"seconds":>9} {"us/call":>9} {"share":>7}',
+            file=file,
+        )
+        for phase in sorted(self.seconds, key=self.seconds.get, reverse=True):
+            seconds = self.seconds[phase]
+            calls = self.calls[phase]
+            print(
+                f'{phase:>16} {calls:>10} {seconds:>9.3f} '
+                f'{seconds / calls * 1e6:>9.2f} {seconds / self.elapsed:>7.1%}',
+                file=file,
+            )
+        print(f'{"total":>16} {"":>10} {self.elapsed:>9.3f}', file=file)
+
+
+@contextlib.contextmanager
+def profile(output=None, top=25):
+    """
+    Instrument the phases and run cProfile within the block, then print the
+    breakdown by phase and the ``top`` functions by cumulative time. The raw
+    cProfile statistics are saved to ``output``.
+    """
+    profiler = Profiler()
+    cprofile = cProfile.Profile()
+    profiler.enable()
+    cprofile.enable()
+    try:
+        yield profiler
+    finally:
+        cprofile.disable()
+        profiler.disable()
+        print('Time by phase:')
+        profiler.report()
+        print()
+        stats = pstats.Stats(cprofile)
+        stats.sort_stats('cumulative').print_stats(top)
+        if output:
+            stats.dump_stats(output)
@@ -0,0 +1,172 @@
+"""
+Record played episodes in a compact binary columnar format.
+
+A replay is a directory holding one file per column, where each step is a
+fixed-width record, plus ``schema.json`` with the dtype of every column.
+``EpisodeRecorder`` buffers steps and appends them to the column files in
+bulk every ``chunk_size`` steps. ``ReplayReader`` memory-maps the column
+files, so that replays larger than memory can be read as NumPy views without
+copying them.
+
+Each step holds the observation the action was chosen from, the action, and
+the result and reward that followed. Invalid actions are recorded with result
+-2 and reward 0, while the episode goes on unless it is given up, see
+``blackjack.policies.play_game``. The mask is stored as a bit field where bit
+``i`` tells whether action ``i`` was allowed.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+from blackjack.policies import REWARD_FIELDS, get_reward, reward_key
+
+COLUMNS = {
+    'episode': np.uint64,
+    'step': np.uint8,
+    'player': np.uint8,
+    'dealer': np.uint8,
+    'player_ace': np.uint8,
+    'player_soft': np.uint8,
+    'dealer_ace': np.uint8,
+    'double': np.uint8,
+    'split': np.uint8,
+    'mask': np.uint8,
+    'action': np.int8,
+    'result': np.int8,
+    'reward': np.float32,
+}
+
+# State fields read by the recorder
+RECORDED_FIELDS = (
+    'player', 'dealer', 'player_ace', 'player_soft', 'dealer_ace', 'mask',
+    *REWARD_FIELDS,
+)
+
+
+def _column_path(directory, name):
+    return Path(directory) / f'{name}.bin'
+
+
+def pack_masks(masks):
+    """Return the masks of ``masks`` as bit fields."""
+    masks = np.asarray(masks, dtype=np.uint8).reshape(len(masks), -1)
+    return (masks << np.arange(masks.shape[1], dtype=np.uint8)).sum(
+        axis=1, dtype=np.uint8
+    )
+
+
+def unpack_masks(bits, n_actions=5):
+    """Return the masks of ``bits`` as an array with a column per action."""
+    return (bits[:, None] >> np.arange(n_actions, dtype=np.uint8)) & 1
+
+
+class EpisodeRecorder:
+    """
+    Append the steps of played episodes to the replay in ``directory``.
+
+    Episodes are numbered after those already in the replay. Call ``close``,
+    or use the recorder as a context manager, to write the last steps.
+    """
+
+    def __init__(self, directory, chunk_size=65_536):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        schema = {name: np.dtype(dtype).str for name, dtype in COLUMNS.items()}
+        with open(self.directory / 'schema.json', 'w') as fp:
+            json.dump(schema, fp)
+
+        self.chunk_size = chunk_size
+        self.rows = []
+        self.files = {
+            name: open(_column_path(directory, name), 'ab') for name in COLUMNS
+        }
+        episodes = ReplayReader(directory)['episode']
+        self.episode = int(episodes[-1]) + 1 if len(episodes) else 0
+        self.step = 0
+
+    def record(self, state, action, next_state):
+        """Record that ``action`` was chosen in ``state`` and led to ``next_state``."""
+        result = next_state['result']
+        reward = 0
+        if result >= 0:
+            reward = get_reward(reward_key(next_state))
+        # Masks are kept as they are and packed in bulk
+        self.rows.append((
+            self.episode, self.step, state['player'], state['dealer'],
+            state['player_ace'], state['player_soft'], state['dealer_ace'],
+            state['double'], state['split'], state['mask'], action, result, reward,
+        ))
+        if result >= 0:
+            self.end_episode()
+        else:
+            self.step += 1
+        if len(self.rows) >= self.chunk_size:
+            self.flush()
+
+    def end_episode(self):
+        """Record the next steps in a new episode."""
+        self.episode += 1
+        self.step = 0
+
+    def flush(self):
+        if not self.rows:
+            return
+        columns = list(zip(*self.rows))
+        for (name, dtype), values in zip(COLUMNS.items(), columns):
+            if name == 'mask':
+                array = pack_masks(values)
+            else:
+                array = np.array(values, dtype=dtype)
+            array.tofile(self.files[name])
+            self.files[name].flush()
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        for file in self.files.values():
+            file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReplayReader:
+    """Read the replay in ``directory`` through memory-mapped columns."""
+
+    def __init__(self, directory):
+        schema_path = Path(directory) / 'schema.json'
+        if schema_path.exists():
+            with open(schema_path, 'r') as fp:
+                schema = {
+                    name: np.dtype(dtype) for name, dtype in json.load(fp).items()
+                }
+        else:
+            schema = COLUMNS
+        self.columns = {}
+        for name, dtype in schema.items():
+            path = _column_path(directory, name)
+            if path.exists() and path.stat().st_size:
+                self.columns[name] = np.memmap(path, dtype=dtype, mode='r')
+            else:
+                self.columns[name] = np.empty(0, dtype=dtype)
+        lengths = {len(column) for column in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f'Columns of replay {directory} have different lengths.')
+
+    def __len__(self):
+        return len(self.columns['episode'])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def chunks(self, size=1_000_000):
+        """Yield dicts of views over ``size`` consecutive steps."""
+        for start in range(0, len(self), size):
+            yield {
+                name: column[start:start + size]
+                for name, column in self.columns.items()
+            }
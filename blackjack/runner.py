@@ -0,0 +1,82 @@
+"""
+Run several simulator instances in one container.
+
+``supervise`` launches ``python -m blackjack`` in ``n_instances`` processes,
+each connected to the platform on its own, restarts the instances that crash
+and stops all of them on interrupt. ``load_test`` plays episodes through the
+local stand-in of ``blackjack.local`` on as many processes, to size how many
+instances a container can host.
+"""
+import multiprocessing
+import subprocess
+import sys
+import time
+
+from blackjack.local import run_local
+
+
+def _launch(argv):
+    return subprocess.Popen([sys.executable, '-m', 'blackjack', *argv])
+
+
+def supervise(n_instances, argv=(), *, max_restarts=5, poll_interval=1.0):
+    """
+    Run ``n_instances`` simulators with arguments ``argv`` until they all exit.
+
+    Instances exiting with an error are restarted, at most ``max_restarts``
+    times each. Returns the exit codes of the instances.
+    """
+    processes = [_launch(argv) for _ in range(n_instances)]
+    restarts = [0] * n_instances
+    codes = [None] * n_instances
+    try:
+        while None in codes:
+            time.sleep(poll_interval)
+            for i, process in enumerate(processes):
+                if codes[i] is not None or process.poll() is None:
+                    continue
+                if process.returncode and restarts[i] < max_restarts:
+                    restarts[i] += 1
+                    print(
+                        f'Instance {i} exited with code {process.returncode}, '
+                        f'restart {restarts[i]}/{max_restarts}.'
+                    )
+                    processes[i] = _launch(argv)
+                else:
+                    codes[i] = process.returncode
+    finally:
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    return codes
+
+
+def _run_instance(args):
+    return run_local(*args)
+
+
+def load_test(n_instances, n_episodes, policy_name, config=None):
+    """
+    Play ``n_episodes`` on each of ``n_instances`` processes through the local
+    stand-in, print the throughput of every instance and return their total.
+    """
+    args = [(n_episodes, policy_name, config)] * n_instances
+    if n_instances > 1:
+        with multiprocessing.Pool(n_instances) as pool:
+            runs = pool.map(_run_instance, args)
+    else:
+        runs = [_run_instance(args[0])]
+
+    for i, run in enumerate(runs):
+        print(
+            f'Instance {i}: {run["episodes"]} episodes, {run["steps"]} steps in '
+            f'{run["seconds"]:.2f}s ({run["episodes_per_second"]:.0f} episodes/s)'
+        )
+    total = sum(run['episodes_per_second'] for run in runs)
+    print(f'Total: {total:.0f} episodes/s on {n_instances} instances')
+    return total
@@ -0,0 +1,128 @@
+"""
+Exact expected values of the actions available in Blackjack.
+
+Cards are drawn from an infinite shoe, so that the probability of drawing a
+card does not depend on the cards already dealt. Under the rules of
+``Blackjack`` (the dealer stands on all 17s, ``double`` only at the first step,
+``surrender`` at any step) the expected reward of each action is computed by
+dynamic programming for every state made of the player total, whether the
+player hand is soft, the dealer upcard and whether it is the first step.
+
+The best actions are saved in ``strategy-table.json``, so that choosing an
+action is a single lookup. Regenerate it with ``python -m blackjack.solver``.
+"""
+import functools
+import json
+from pathlib import Path
+
+TABLE_PATH = Path(__file__).parent / 'strategy-table.json'
+TABLE_SHAPE = (2, 2, 22, 12)
+BUST = 22
+
+CARD_PROBABILITIES = {value: 1 / 13 for value in range(2, 12)}
+CARD_PROBABILITIES[10] = 4 / 13
+
+
+def add_card(total: int, soft: bool, card: int):
+    """Return total and softness of a hand after drawing ``card``."""
+    if card == 11:
+        if total + 11 <= 21:
+            return total + 11, True
+        card = 1
+    total += card
+    if total > 21 and soft:
+        return total - 10, False
+    return total, soft
+
+
+@functools.lru_cache(maxsize=None)
+def dealer_outcomes(total: int, soft: bool):
+    """Return the probabilities of the final dealer totals, ``BUST`` if over 21."""
+    if total > 21:
+        return {BUST: 1.0}
+    if total >= 17:
+        return {total: 1.0}
+    outcomes = {}
+    for card, prob in CARD_PROBABILITIES.items():
+        for final, final_prob in dealer_outcomes(*add_card(total, soft, card)).items():
+            outcomes[final] = outcomes.get(final, 0) + prob * final_prob
+    return outcomes
+
+
+@functools.lru_cache(maxsize=None)
+def stay_value(player: int, upcard: int) -> float:
+    """Return the expected reward of staying with ``player`` against ``upcard``."""
+    value = 0
+    for dealer, prob in dealer_outcomes(upcard, upcard == 11).items():
+        if dealer == BUST or player > dealer:
+            value += prob
+        elif player < dealer:
+            value -= prob
+    return value
+
+
+@functools.lru_cache(maxsize=None)
+def expected_values(player: int, soft: bool, upcard: int, first_step: bool):
+    """Return the expected reward of each action code allowed in a state."""
+    hit = 0
+    double = 0
+    for card, prob in CARD_PROBABILITIES.items():
+        total, total_soft = add_card(player, soft, card)
+        if total > 21:
+            hit -= prob
+            double -= 2 * prob
+        else:
+            next_values = expected_values(total, total_soft, upcard, False)
+            hit += prob * max(next_values.values())
+            double += 2 * prob * stay_value(total, upcard)
+    values = {0: stay_value(player, upcard), 1: hit, 3: -0.5}
+    if first_step:
+        values[2] = double
+    return values
+
+
+def best_action(player: int, soft: bool, upcard: int, first_step: bool) -> int:
+    values = expected_values(player, soft, upcard, first_step)
+    return max(values, key=values.get)
+
+
+def table_index(player: int, soft: bool, upcard: int, first_step: bool) -> int:
+    """Return the position of a state in the flat strategy table."""
+    _, n_soft, n_player, n_upcard = TABLE_SHAPE
+    row = (int(first_step) * n_soft + int(soft)) * n_player + player
+    return row * n_upcard + upcard
+
+
+def solve():
+    """Return the best action of every state, flattened like ``table_index``."""
+    actions = [0] * functools.reduce(int.__mul__, TABLE_SHAPE)
+    for first_step in (False, True):
+        for soft in (False, True):
+            for player in range(12 if soft else 2, 22):
+                for upcard in range(2, 12):
+                    actions[table_index(player, soft, upcard, first_step)] = (
+                        best_action(player, soft, upcard, first_step)
+                    )
+    return actions
+
+
+def save_table(path=TABLE_PATH, actions=None):
+    """Save ``actions``, by default those of ``solve``, as a strategy table."""
+    if actions is None:
+        actions = solve()
+    with open(path, 'w') as fp:
+        json.dump({'shape': TABLE_SHAPE, 'actions': list(actions)}, fp)
+
+
+@functools.lru_cache(maxsize=None)
+def load_table(path=TABLE_PATH):
+    """Return the strategy table saved in ``path`` as a tuple of action codes."""
+    with open(path, 'r') as fp:
+        table = json.load(fp)
+    if tuple(table['shape']) != TABLE_SHAPE:
+        raise ValueError(f'Unexpected strategy table shape {table["shape"]}.')
+    return tuple(table['actions'])
+
+
+if __name__ == '__main__':
+    save_table()
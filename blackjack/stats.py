@@ -0,0 +1,97 @@
+"""
+Streaming statistics of policy evaluations.
+
+Rewards take only a handful of values, so finished games are counted by their
+``get_reward`` key, like ``(result, double, surrender)``, instead of being
+stored. Memory does not
+grow with the number of games, counts from several workers can be merged,
+and mean and variance are computed exactly from the counts. The differences
+between the rewards of paired games are counted the same way.
+"""
+import collections
+import math
+
+Z_95 = 1.959963984540054
+
+# Games played before an evaluation may stop on its target standard error, as
+# the standard error of a few games is unreliable, e.g. zero if they all draw
+MIN_GAMES = 1000
+
+
+class RewardStats(collections.Counter):
+    """
+    Count of ``get_reward`` keys with reward statistics.
+
+    Games halted by invalid actions have no reward, they are only counted in
+    ``halted``, which is merged by ``update``.
+    """
+    halted = 0
+
+    def update(self, other=(), **kwargs):
+        super().update(other, **kwargs)
+        self.halted += getattr(other, 'halted', 0)
+
+    def __reduce__(self):
+        # Counter only pickles the counts
+        return type(self), (dict(self),), {'halted': self.halted}
+
+    @property
+    def n(self) -> int:
+        return sum(self.values())
+
+    def _rewards(self):
+        # Imported here as policies builds on this module
+        from blackjack.policies import get_reward
+
+        # Sorted, so that equal counts always give bit-identical statistics
+        return [(get_reward(key), self[key]) for key in sorted(self)]
+
+    @property
+    def mean(self) -> float:
+        rewards = self._rewards()
+        return sum(reward * cnt for reward, cnt in rewards) / self.n
+
+    @property
+    def variance(self) -> float:
+        """Return the sample variance of the rewards."""
+        n = self.n
+        if n < 2:
+            return math.inf
+        mean = self.mean
+        squares = sum(cnt * (reward - mean) ** 2 for reward, cnt in self._rewards())
+        return squares / (n - 1)
+
+    @property
+    def stderr(self) -> float:
+        """Return the standard error of the mean reward."""
+        return math.sqrt(self.variance / self.n) if self.n else math.inf
+
+    @property
+    def ci95(self):
+        """Return the bounds of the 95% confidence interval of the mean reward."""
+        half_width = Z_95 * self.stderr
+        return self.mean - half_width, self.mean + half_width
+
+    def __str__(self):
+        halted = f', {self.halted} halted' if self.halted else ''
+        return (
+            f'{self.mean:.5f} ± {Z_95 * self.stderr:.5f} '
+            f'(95% CI, {self.n} games{halted})'
+        )
+
+    def reached(self, target_stderr, min_games=MIN_GAMES) -> bool:
+        """
+        Return True if the standard error of at least ``min_games`` games is
+        below ``target_stderr``.
+        """
+        return (
+            target_stderr is not None and self.n >= min_games
+            and self.stderr <= target_stderr
+        )
+
+
+class DifferenceStats(RewardStats):
+    """Count of the differences between the rewards of paired games."""
+
+    def _rewards(self):
+        return sorted(self.items())
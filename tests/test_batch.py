@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from blackjack.batch import BatchBlackjack
+from blackjack.blackjack import Blackjack, Card, Deck, SimulatorModel
+
+
+def scalar_model(deck_values):
+    """Return a model whose deck deals cards in the order of ``deck_values``."""
+    deck = Deck()
+    ranks = {value: rank for rank, value in zip('23456789', range(2, 10))}
+    ranks.update({10: '10', 11: 'A'})
+    deck.cards = [Card(ranks[int(value)], 'x') for value in reversed(deck_values)]
+    model = SimulatorModel()
+    model.blackjack = Blackjack(deck)
+    return model, {'result': -1, **model.blackjack.state}
+
+
+def assert_same_state(batch_state, scalar_state, row):
+    keys = ('result', 'player', 'dealer', 'player_ace', 'player_soft', 'dealer_ace')
+    for key in keys:
+        assert np.array_equal(batch_state[key][row], scalar_state[key]), key
+    # Batch games cannot be split
+    assert np.array_equal(batch_state['mask'][row][:4], scalar_state['mask'][:4])
+    assert batch_state['mask'][row][4] == 0
+    assert bool(batch_state['double'][row]) == scalar_state['double']
+    assert bool(batch_state['surrender'][row]) == scalar_state['surrender']
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_batch_matches_scalar(seed):
+    n_games = 500
+    rng = np.random.default_rng(seed)
+    batch = BatchBlackjack(seed)
+    batch_state = batch.reset(n_games)
+
+    games = [scalar_model(batch.deck[row]) for row in range(n_games)]
+    for row, (_, state) in enumerate(games):
+        assert_same_state(batch_state, state, row)
+
+    while not batch.done.all():
+        actions = rng.integers(0, 4, size=n_games)
+        playing = np.flatnonzero(~batch.done)
+        batch_state = batch.step(actions)
+        for row in playing:
+            model, _ = games[row]
+            state = model.step({'command': int(actions[row])})
+            assert_same_state(batch_state, state, row)
+
+
+def test_finished_games_ignore_actions():
+    batch = BatchBlackjack(0)
+    batch.reset(10)
+    state = batch.step(np.full(10, 3))
+    assert (state['result'] == 0).all()
+    again = batch.step(np.ones(10, dtype=int))
+    for key, value in state.items():
+        assert np.array_equal(value, again[key])
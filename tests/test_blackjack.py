@@ -1,7 +1,14 @@
+import enum
+from typing import NamedTuple
+
 import pytest
 
-from blackjack.blackjack import Card, Hand
-from blackjack.policies import get_reward
+from blackjack.blackjack import (
+    STATE_FIELDS, Blackjack, Card, Deck, GameLostException, GameSurrenderException,
+    MAX_HANDS, GameWonException, Hand, Observation, Outcome, SimulatorModel,
+    interface_fields, load_interface,
+)
+from blackjack.policies import get_reward, reward_key
 
 
 hands = [
@@ -16,6 +23,8 @@ hands = [
     (Hand([Card('A', 'x'), Card('A', 'x'), Card('A', 'x')]), 13),
     (Hand([Card('A', 'x'), Card('J', 'x'), Card('Q', 'x')]), 21),
     (Hand([Card('A', 'x'), Card('J', 'x'), Card('Q', 'x'), Card('J', 'x')]), 31),
+    (Hand([Card('A', 'x')] * 8), 18),
+    (Hand([Card('A', 'x')] * 8 + [Card('4', 'x')]), 12),
 ]
 
 
@@ -24,6 +33,20 @@ def test_hand_value(test_input, expected):
     assert test_input.value == expected
 
 
+def test_cards_are_interned():
+    assert Card('Q', '♠') is Card('Q', '♠')
+    assert Card('Q', '♠').rank_numeric == 10
+    assert str(Hand([Card('Q', '♠')])) == "[Card('Q', '♠')]"
+    assert sorted(Deck().cards, key=id) == sorted(Deck().cards, key=id)
+
+
+def test_hand_value_after_add():
+    hand = Hand([Card('A', 'x'), Card('5', 'x')])
+    assert hand.value == 16 and hand.is_soft
+    hand.add([Card('9', 'x')])
+    assert hand.value == 15 and not hand.is_soft
+
+
 def test_hand_value_raises_valueerror():
     with pytest.raises(ValueError):
         Hand([Card('F', 'x')]).value
@@ -109,3 +132,142 @@ reward_states = [
 @pytest.mark.parametrize("state, expected", reward_states)
 def test_state_has_reward(state, expected):
     assert get_reward(state) == expected
+
+
+def rigged_game(*ranks):
+    """Return a game dealing ``ranks`` in order, player first and then dealer."""
+    deck = Deck()
+    deck.cards = [Card(rank, 'x') for rank in reversed(ranks)]
+    return Blackjack(deck)
+
+
+outcomes = [
+    (('10', '9', '10', '7'), ['stay'], Outcome.WON, GameWonException),
+    (('10', '6', '10', '10'), ['hit'], Outcome.LOST, GameLostException),
+    (('10', '6', '10'), ['surrender'], Outcome.LOST, GameSurrenderException),
+    (('5', '6', '10', '9', '7'), ['hit', 'stay'], Outcome.WON, GameWonException),
+]
+
+
+@pytest.mark.parametrize("ranks, actions, outcome, exception", outcomes)
+def test_play_returns_outcome(ranks, actions, outcome, exception):
+    game = rigged_game(*ranks)
+    for action in actions[:-1]:
+        assert game.play(action) == Outcome.PLAY
+    assert game.play(actions[-1]) == outcome
+
+    game = rigged_game(*ranks)
+    for action in actions[:-1]:
+        game.step(action)
+    with pytest.raises(exception):
+        game.step(actions[-1])
+
+
+def test_observe_matches_state():
+    game = rigged_game('A', '6', '9')
+    assert set(STATE_FIELDS) == set(game.state)
+    assert game.observe(STATE_FIELDS) == game.state
+    assert game.observe(['player', 'player_soft']) == {'player': 17, 'player_soft': 1}
+
+
+def test_model_builds_only_requested_fields():
+    model = SimulatorModel(fields=interface_fields(load_interface()))
+    state = model.reset({})
+    assert set(state) == set(interface_fields(model.interface))
+    state = model.step({'command': 0})
+    assert set(state) == set(interface_fields(model.interface))
+
+
+observations = [
+    (('A', '6', '9'), [], Observation(17, True, False, 9, True)),
+    (('8', '8', 'K'), [], Observation(16, False, True, 10, True)),
+    (('K', 'Q', 'A'), [], Observation(20, False, True, 11, True)),
+    (('A', '6', '9', '10'), ['hit'], Observation(17, False, False, 9, False)),
+    (('4', '4', '5', '4'), ['hit'], Observation(12, False, False, 5, False)),
+]
+
+
+@pytest.mark.parametrize("ranks, actions, expected", observations)
+def test_observation(ranks, actions, expected):
+    game = rigged_game(*ranks)
+    for action in actions:
+        game.play(action)
+    assert game.observation == expected
+
+
+splits = [
+    # Two hands losing to 17
+    (
+        ('8', '8', '10', '3', '5', '7'), ['split', 'stay', 'stay'],
+        Outcome.LOST, [0, 0, -1, -1], [0, 0, 0, 0], -2,
+    ),
+    # Double-down after splitting
+    (
+        ('8', '8', '10', '10', '2', '9', '7'), ['split', 'stay', 'double'],
+        Outcome.WON, [2, 2, -1, -1], [0, 1, 0, 0], 3,
+    ),
+    # Split aces receive one card each
+    (
+        ('A', 'A', '9', 'K', '5', '8'), ['split'],
+        Outcome.DRAW, [2, 0, -1, -1], [0, 0, 0, 0], 0,
+    ),
+    # Re-split, the dealer does not play when every hand busted
+    (
+        ('8', '8', '6', '8', '9', '5', '10', '10', '10', '10'),
+        ['split', 'split', 'hit', 'hit', 'hit'],
+        Outcome.LOST, [0, 0, 0, -1], [0, 0, 0, 0], -3,
+    ),
+]
+
+
+@pytest.mark.parametrize("ranks, actions, outcome, results, doubles, reward", splits)
+def test_split(ranks, actions, outcome, results, doubles, reward):
+    game = rigged_game(*ranks)
+    for action in actions[:-1]:
+        assert game.play(action) == Outcome.PLAY
+    assert game.play(actions[-1]) == outcome
+    state = {'result': outcome, **game.state}
+    assert state['hand_results'] == results
+    assert state['hand_doubles'] == doubles
+    assert get_reward(reward_key(state)) == reward
+
+
+def test_split_masks():
+    game = rigged_game('8', '8', '10', '8', '8', '8', '2')
+    assert game.get_mask() == [1, 1, 1, 1, 1]
+    for _ in range(MAX_HANDS - 1):
+        game.play('split')
+    # No more hands, no surrender after splitting
+    assert game.get_mask() == [1, 1, 1, 0, 0]
+    with pytest.raises(RuntimeError):
+        game.play('split')
+    with pytest.raises(RuntimeError):
+        game.play('surrender')
+    game.play('hit')
+    assert game.get_mask() == [1, 1, 0, 0, 0]
+
+
+def test_split_needs_pair():
+    game = rigged_game('8', '9', '10')
+    assert game.get_mask() == [1, 1, 1, 1, 0]
+    with pytest.raises(RuntimeError):
+        game.play('split')
+
+
+EventType = enum.Enum('EventType', 'EPISODE_START EPISODE_STEP IDLE UNKNOWN')
+
+
+class LocalEvent(NamedTuple):
+    event_type: EventType
+    event_content: object = None
+
+
+def test_dispatch_event_without_connector():
+    sim = SimulatorModel()
+    state = sim.dispatch_event(LocalEvent(EventType.EPISODE_START, {}))
+    assert state['result'] == -1
+    state = sim.dispatch_event(LocalEvent(EventType.EPISODE_STEP, {'command': 0}))
+    assert state['result'] >= 0
+    assert sim.dispatch_event(LocalEvent(EventType.IDLE)) is None
+    with pytest.raises(RuntimeError):
+        sim.dispatch_event(LocalEvent(EventType.UNKNOWN))
@@ -0,0 +1,88 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from blackjack.brain import BrainClient, play_concurrently
+from blackjack.policies import BrainPolicy
+
+
+class PredictHandler(BaseHTTPRequestHandler):
+    """Mimic ``/v2/clients/{id}/predict`` of a brain that hits below 17."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        match = re.fullmatch(r'/v2/clients/(\w+)/predict', self.path)
+        with server.lock:
+            server.requests += 1
+            server.clients.add(match.group(1))
+            fail = server.failures > 0
+            server.failures -= fail
+        if fail:
+            self.send_error(503)
+            return
+        state = json.loads(body)['state']
+        command = int(state['player'] < 17)
+        payload = json.dumps(
+            {'concepts': {'PlayBlackjack': {'action': {'command': command}}}}
+        ).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def brain_server():
+    server = ThreadingHTTPServer(('localhost', 0), PredictHandler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.clients = set()
+    server.failures = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_brain_policy_predicts(brain_server):
+    port = brain_server.server_port
+    policy = BrainPolicy('localhost', port, concept_name='PlayBlackjack')
+    assert policy.step({'player': 12}) == {'command': 1}
+    assert policy.step({'player': 18}) == {'command': 0}
+    assert brain_server.clients == {policy.client_id}
+
+
+def test_brain_client_retries(brain_server):
+    brain_server.failures = 2
+    client = BrainClient('localhost', brain_server.server_port, retries=3)
+    client.predict('client', {'player': 12})
+    assert brain_server.requests == 3
+
+
+def test_brain_client_gives_up(brain_server):
+    brain_server.failures = 5
+    client = BrainClient('localhost', brain_server.server_port, retries=1)
+    with pytest.raises(ValueError):
+        client.predict('client', {'player': 12})
+
+
+def test_play_concurrently(brain_server):
+    port = brain_server.server_port
+    results = play_concurrently(
+        50,
+        lambda: BrainPolicy('localhost', port, concept_name='PlayBlackjack'),
+        concurrency=4,
+        batch_size=5,
+    )
+    assert sum(results.values()) == 50
+    assert len(brain_server.clients) == 4
@@ -0,0 +1,55 @@
+import pytest
+
+from blackjack.cache import CachedPolicy, DecisionCache
+from blackjack.policies import OptimalPolicy, Policy, RandomPolicy
+
+
+class CountingPolicy(Policy):
+    deterministic = True
+    observed_fields = ('player', 'mask')
+
+    def __init__(self):
+        self.calls = 0
+
+    def step(self, state):
+        self.calls += 1
+        return {'command': int(state['player'] < 17)}
+
+
+def test_cached_policy_calls_policy_once_per_state():
+    policy = CountingPolicy()
+    cached = CachedPolicy(policy)
+    for player in (12, 18, 12, 12, 18):
+        action = cached.step({'player': player, 'dealer': player, 'mask': [1, 1, 0]})
+        assert action == {'command': int(player < 17)}
+    assert policy.calls == 2
+    assert (cached.cache.hits, cached.cache.misses) == (3, 2)
+
+
+def test_cache_drops_least_recently_used():
+    cache = DecisionCache(maxsize=2)
+    cache.put(1, 'a')
+    cache.put(2, 'b')
+    cache.get(1)
+    cache.put(3, 'c')
+    assert cache.get(2) is None
+    assert cache.get(1) == 'a' and cache.get(3) == 'c'
+
+
+def test_cache_persistence(tmp_path):
+    path = tmp_path / 'cache.json'
+    cached = CachedPolicy(CountingPolicy())
+    cached.step({'player': 12, 'mask': [1, 1, 1]})
+    cached.cache.save(path)
+
+    policy = CountingPolicy()
+    warm = DecisionCache()
+    warm.load(path)
+    assert CachedPolicy(policy, warm).step({'player': 12, 'mask': [1, 1, 1]})
+    assert policy.calls == 0
+
+
+def test_cached_policy_requires_deterministic_policy():
+    with pytest.raises(ValueError):
+        CachedPolicy(RandomPolicy((0, 1)))
+    CachedPolicy(OptimalPolicy())
@@ -0,0 +1,42 @@
+import pytest
+
+from blackjack.compare import compare_policies, play_episode
+from blackjack.policies import OptimalPolicy, make_model
+
+
+def test_same_seed_deals_same_cards():
+    policy = OptimalPolicy()
+    models = [make_model(policy), make_model(policy)]
+    for game in range(20):
+        config = {'seed': f'test-{game}'}
+        assert play_episode(policy, models[0], config) == (
+            play_episode(policy, models[1], config)
+        )
+
+
+def test_identical_policies_do_not_differ(capsys):
+    _, differences = compare_policies(
+        500, ['optimal', 'optimal'], 'localhost', 5000, seed=0
+    )
+    assert dict(differences['optimal']) == {0: 500}
+
+
+def test_paired_difference_is_more_precise(capsys):
+    results, differences = compare_policies(
+        2000, ['basic', 'optimal'], 'localhost', 5000, seed=1
+    )
+    difference = differences['optimal']
+    assert difference.n == 2000
+    assert difference.mean == pytest.approx(
+        results['optimal'].mean - results['basic'].mean
+    )
+    independent = (results['basic'].variance + results['optimal'].variance) / 2000
+    assert difference.stderr ** 2 < independent / 2
+    out = capsys.readouterr().out
+    assert 'Largest differences by starting state, optimal - basic:' in out
+
+
+@pytest.mark.parametrize('policies', [['basic'], ['basic', 'player']])
+def test_invalid_comparisons(policies):
+    with pytest.raises(ValueError):
+        compare_policies(10, policies, 'localhost', 5000)
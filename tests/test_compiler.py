@@ -0,0 +1,129 @@
+import random
+
+import pytest
+
+from blackjack.batch import play_table
+from blackjack.compiler import (
+    compile_policy, only_pairs, reachable_states, representative_game,
+)
+from blackjack.policies import (
+    OptimalPolicy, Policy, RandomPolicy, TablePolicy, make_model, play_games,
+)
+from blackjack.solver import load_table, save_table, table_index
+
+
+class ThresholdPolicy(Policy):
+    deterministic = True
+    observed_fields = ('player', 'dealer_ace', 'mask')
+
+    def __init__(self):
+        self.calls = 0
+
+    def step(self, state):
+        self.calls += 1
+        return {'command': int(state['player'] < 17 or state['dealer_ace'] == 1)}
+
+
+class SplitPolicy(Policy):
+    """Split every hand, whether or not it is a pair."""
+    deterministic = True
+    observed_fields = ('player',)
+
+    def step(self, state):
+        return {'command': 4}
+
+
+def test_representative_games_are_in_their_state():
+    for player, soft, upcard, first_step in reachable_states():
+        game = representative_game(player, soft, upcard, first_step)
+        assert game.player_hand.value == player
+        assert game.player_hand.is_soft == soft
+        assert game.dealer_hand.value == upcard
+        assert game.first_step == first_step
+
+
+@pytest.mark.parametrize("state", [
+    (4, False, 10, False), (12, True, 2, False), (21, False, 5, True),
+])
+def test_unreachable_states(state):
+    assert representative_game(*state) is None
+    assert state not in set(reachable_states())
+
+
+def test_compile_queries_policy_once_per_state():
+    policy = ThresholdPolicy()
+    table = compile_policy(policy)
+    assert policy.calls == len(list(reachable_states()))
+    assert table[table_index(16, False, 10, True)] == 1
+    assert table[table_index(18, False, 10, False)] == 0
+    assert table[table_index(18, True, 11, False)] == 1
+
+
+def test_compiled_optimal_policy_matches_solver():
+    table = compile_policy(OptimalPolicy())
+    solved = load_table()
+    for state in reachable_states():
+        assert table[table_index(*state)] == solved[table_index(*state)]
+
+
+def test_splits_are_only_compiled_for_pairs():
+    table = compile_policy(SplitPolicy())
+    for player, soft, upcard, first_step in reachable_states():
+        game = representative_game(player, soft, upcard, first_step)
+        action = table[table_index(player, soft, upcard, first_step)]
+        if first_step and only_pairs(player, soft):
+            assert game.can_split
+            assert action == 4
+        else:
+            assert action == 1
+
+
+def test_table_policy_hits_instead_of_masked_splits():
+    policy = TablePolicy(compile_policy(SplitPolicy()))
+    random.seed(0)
+    results = play_games(2000, policy, make_model(policy))
+    # No game is halted by a split of a non-pair or beyond MAX_HANDS
+    assert results.n == 2000
+    assert any(len(key) > 3 for key in results)
+
+
+def test_compile_rejects_random_policy():
+    with pytest.raises(ValueError):
+        compile_policy(RandomPolicy((0, 1)))
+
+
+def test_table_policy_plays_like_policy(tmp_path):
+    path = tmp_path / 'table.json'
+    save_table(path, compile_policy(ThresholdPolicy()))
+    table_policy = TablePolicy(load_table(path))
+
+    results = []
+    for policy in (ThresholdPolicy(), table_policy):
+        random.seed(3)
+        results.append(play_games(200, policy, make_model(policy)))
+    assert results[0] == results[1]
+
+
+def test_play_table():
+    table = load_table()
+    results = play_table(table, 5000, seed=0, batch_size=1000)
+    assert results.n == 5000
+    assert results == play_table(table, 5000, seed=0, batch_size=1000)
+    assert abs(results.mean) < 0.1
+
+
+def test_play_table_hits_instead_of_splits():
+    table = compile_policy(SplitPolicy())
+    results = play_table(table, 2000, seed=0)
+    assert results.n == 2000
+    assert results.halted == 0
+
+
+def test_play_table_counts_halted_games():
+    # Hit at the first step, then double, which is not allowed
+    half = len(load_table()) // 2
+    table = [2] * half + [1] * half
+    results = play_table(table, 2000, seed=0)
+    assert results.halted > 0
+    assert results.n + results.halted == 2000
+    assert f'{results.halted} halted' in str(results)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from blackjack.env import OBSERVATION_FIELDS, BatchVectorEnv, VectorEnv
+
+
+@pytest.fixture(params=['scalar', 'batch'])
+def env(request):
+    if request.param == 'scalar':
+        return VectorEnv(8)
+    return BatchVectorEnv(8, seed=0)
+
+
+def test_observations_follow_interface(env):
+    observations, info = env.reset()
+    assert observations.shape == (8, len(OBSERVATION_FIELDS))
+    assert info['mask'].shape == (8, 5)
+    assert (observations[:, OBSERVATION_FIELDS.index('result')] == -1).all()
+    assert (info['mask'][:, 2] == 1).all()
+
+
+def test_finished_episodes_are_reset(env):
+    env.reset()
+    observations, rewards, dones, info = env.step(np.zeros(8, dtype=int))
+    assert dones.all()
+    assert set(rewards) <= {-1, 0, 1}
+    result = OBSERVATION_FIELDS.index('result')
+    assert (observations[:, result] == -1).all()
+    assert (info['final_observation'][:, result] >= 0).all()
+
+
+def test_surrender_and_halt(env):
+    env.reset()
+    _, rewards, dones, _ = env.step(np.full(8, 3))
+    assert dones.all() and (rewards == -0.5).all()
+
+    _, _, busted, _ = env.step(np.ones(8, dtype=int))
+    _, rewards, dones, info = env.step(np.full(8, 2))
+    assert dones.all()
+    assert (info['halted'] == ~busted).all()
+    assert (rewards[info['halted']] == 0).all()
+    assert set(rewards[busted]) <= {-2, 0, 2}
+
+
+def test_batch_env_steps_many_environments():
+    env = BatchVectorEnv(10_000, seed=1)
+    env.reset()
+    for _ in range(10):
+        _, rewards, dones, info = env.step(np.zeros(10_000, dtype=int))
+        assert dones.all()
+    assert -0.4 < rewards.mean() < 0
@@ -0,0 +1,126 @@
+import enum
+import io
+import json
+import logging
+import threading
+
+import pytest
+
+from blackjack.blackjack import SimulatorModel
+from blackjack.eventlog import EventLog
+
+EventType = enum.Enum('EventType', 'EPISODE_START EPISODE_STEP EPISODE_FINISH IDLE')
+
+
+def log_games(event_log, results, session=None):
+    """Log a game of two steps ending with every result."""
+    for result in results:
+        event_log.log(EventType.EPISODE_START, {'result': -1}, session)
+        event_log.log(EventType.EPISODE_STEP, {'result': -1}, session)
+        event_log.log(EventType.EPISODE_STEP, {'result': result}, session)
+        event_log.log(EventType.EPISODE_FINISH, {'reason': 'Finished'}, session)
+        event_log.log(EventType.IDLE, None, session)
+
+
+def logged_lines(results, **options):
+    file = io.StringIO()
+    with EventLog(file, **options) as event_log:
+        log_games(event_log, results)
+    return file.getvalue().splitlines()
+
+
+def test_every_event_is_written():
+    lines = logged_lines([2, 0, 1])
+    assert len(lines) == 15
+    time, event_type, state = lines[2].split(' ', 2)
+    assert event_type == 'EventType.EPISODE_STEP'
+    assert state == "{'result': 2}"
+
+
+@pytest.mark.parametrize('every, episodes', [(1, 9), (3, 3), (4, 3), (10, 1)])
+def test_one_episode_out_of_every(every, episodes):
+    lines = logged_lines([2] * 9, every=every)
+    assert len(lines) == 5 * episodes
+
+
+def test_terminal_states_only():
+    lines = logged_lines([2, 0, -2], terminal=True)
+    assert [line.split(' ', 2)[2] for line in lines] == [
+        "{'result': 2}", "{'result': 0}", "{'result': -2}",
+    ]
+
+
+def test_sessions_are_sampled_separately():
+    file = io.StringIO()
+    with EventLog(file, every=2, json_lines=True) as event_log:
+        for _ in range(2):
+            log_games(event_log, [1], 'session-0')
+            log_games(event_log, [1], 'session-1')
+    records = [json.loads(line) for line in file.getvalue().splitlines()]
+    assert {record['session'] for record in records} == {'session-0', 'session-1'}
+    assert len(records) == 10
+    assert records[2]['event'] == 'EPISODE_STEP'
+    assert records[2]['state'] == {'result': 1}
+
+
+def test_counters_replace_events():
+    lines = logged_lines([2, 2, 1, 0], counters=60, json_lines=True)
+    assert len(lines) == 1
+    counters = json.loads(lines[0])
+    assert counters['episodes'] == 4
+    assert counters['episodes_per_second'] > 0
+    assert counters['won'] == 0.5
+    assert counters['draw'] == counters['lost'] == 0.25
+    assert counters['halted'] == 0
+
+
+def test_counters_are_read_while_logging():
+    event_log = EventLog(io.StringIO(), counters=60)
+    done = threading.Event()
+    errors = []
+
+    def read():
+        while not done.is_set():
+            try:
+                event_log._format_counters()
+            except Exception as error:
+                errors.append(error)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for result in range(100_000):
+            event_log.log(EventType.EPISODE_STEP, {'result': result})
+    finally:
+        done.set()
+        reader.join()
+        event_log.close()
+    assert not errors
+    assert sum(event_log.results.values()) == 100_000
+
+
+def test_log_file_is_appended(tmp_path):
+    path = tmp_path / 'events.log'
+    for _ in range(2):
+        with EventLog(str(path), terminal=True) as event_log:
+            log_games(event_log, [2])
+        assert event_log.file.closed
+    assert len(path.read_text().splitlines()) == 2
+
+
+def test_pending_events_are_bounded():
+    event_log = EventLog(io.StringIO(), max_pending=3, flush_interval=60)
+    log_games(event_log, [2])
+    assert event_log.dropped == 2
+    event_log.close()
+    assert len(event_log.file.getvalue().splitlines()) == 3
+
+
+def test_simulator_exceptions_are_logged(caplog):
+    sim = SimulatorModel()
+    sim.reset({})
+    with caplog.at_level(logging.ERROR):
+        state = sim.step({'command': 9})
+    assert state['halted']
+    assert caplog.records[0].name == 'blackjack.blackjack'
+    assert caplog.records[0].exc_info is not None
@@ -0,0 +1,103 @@
+import collections
+import random
+
+import pytest
+
+from blackjack.exact import evaluate_exact
+from blackjack.policies import (
+    BasicPolicy, OptimalPolicy, Policy, RandomPolicy, make_model, play_games,
+)
+from blackjack.solver import CARD_PROBABILITIES, add_card, expected_values
+
+
+class SplitPolicy(Policy):
+    """Split whenever allowed, stay otherwise."""
+    deterministic = True
+    observed_fields = ('observation', 'mask')
+
+    def step(self, state):
+        return {'command': 4 if state['mask'][4] else 0}
+
+
+class StayPolicy(Policy):
+    deterministic = True
+    observed_fields = ('observation',)
+
+    def step(self, state):
+        return {'command': 0}
+
+
+class UnmaskedSplitPolicy(Policy):
+    """Split every hand, whether or not it is allowed."""
+    deterministic = True
+    observed_fields = ('observation',)
+
+    def step(self, state):
+        return {'command': 4}
+
+
+def hand_counts(stats):
+    """Return the expected number of hands per game ending with each key."""
+    counts = collections.Counter()
+    for key, count in stats.items():
+        counts[key[:3]] += count
+        for result, double in key[3:]:
+            counts[result, double, False] += count
+    return {key: count / stats.n for key, count in counts.items()}
+
+
+def test_infinite_shoe_matches_solver():
+    distribution = evaluate_exact(OptimalPolicy(), decks=None)
+    expected = 0
+    for first, first_prob in CARD_PROBABILITIES.items():
+        for second, second_prob in CARD_PROBABILITIES.items():
+            total, soft = add_card(*add_card(0, False, first), second)
+            for upcard, upcard_prob in CARD_PROBABILITIES.items():
+                values = expected_values(total, soft, upcard, True)
+                prob = first_prob * second_prob * upcard_prob
+                expected += prob * max(values.values())
+    assert distribution.mean == pytest.approx(expected, abs=1e-12)
+    assert distribution.hands == pytest.approx(1)
+    assert distribution.split == 0
+
+
+def test_split_policy_hands():
+    distribution = evaluate_exact(SplitPolicy(), decks=None)
+    assert distribution.split == pytest.approx(25 / 169)
+    # Re-split pairs add more than one hand
+    assert distribution.hands > 1 + distribution.split
+    assert distribution.double == 0
+    assert distribution.won + distribution.draw + distribution.lost == (
+        pytest.approx(distribution.hands)
+    )
+    # Split games are drawn with replacement only from finite shoes
+    assert distribution.exact
+    assert ' exactly ' in str(distribution)
+
+
+def test_finite_shoe_without_splits_is_exact():
+    distribution = evaluate_exact(StayPolicy(), decks=1)
+    assert distribution.split == 0
+    assert distribution.exact
+
+
+def test_exact_matches_sampling():
+    policy = BasicPolicy()
+    distribution = evaluate_exact(policy, decks=1)
+    assert not distribution.exact
+    assert ' approximately ' in str(distribution)
+    random.seed(0)
+    stats = play_games(20_000, policy, make_model(policy))
+    assert abs(stats.mean - distribution.mean) < 4 * stats.stderr
+    sampled = hand_counts(stats)
+    for key, count in distribution.items():
+        assert sampled.get(key, 0) == pytest.approx(count, abs=0.015)
+
+
+@pytest.mark.parametrize('policy', [
+    RandomPolicy([0, 1]),
+    UnmaskedSplitPolicy(),
+])
+def test_invalid_policies(policy):
+    with pytest.raises(ValueError):
+        evaluate_exact(policy, decks=None)
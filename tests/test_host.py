@@ -0,0 +1,121 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+BonsaiEventType = pytest.importorskip('bonsai_connector.connector').BonsaiEventType
+
+from blackjack.host import SimulatorHost  # noqa: E402
+from blackjack.local import LocalConnector, LocalEvent  # noqa: E402
+from blackjack.policies import OptimalPolicy  # noqa: E402
+
+
+class CountingConnector(LocalConnector):
+    """Record the highest number of sessions waiting on a connector at once."""
+    lock = threading.Lock()
+    waiting = 0
+    most_waiting = 0
+
+    def next_event(self, state):
+        cls = CountingConnector
+        with cls.lock:
+            cls.waiting += 1
+            cls.most_waiting = max(cls.most_waiting, cls.waiting)
+        try:
+            return super().next_event(state)
+        finally:
+            with cls.lock:
+                cls.waiting -= 1
+
+
+class UnregisteringConnector(LocalConnector):
+    def next_event(self, state):
+        if self.episodes == 2 and not self.in_episode:
+            return LocalEvent(BonsaiEventType.UNREGISTER)
+        return super().next_event(state)
+
+
+class InterruptingConnector(LocalConnector):
+    def next_event(self, state):
+        if self.episodes == 3 and not self.in_episode:
+            os.kill(os.getpid(), signal.SIGINT)
+            time.sleep(0.05)
+        return super().next_event(state)
+
+
+class FailingConnector(LocalConnector):
+    def next_event(self, state):
+        raise ConnectionError('lost')
+
+
+def run(factory, n_sessions, **options):
+    host = SimulatorHost(factory, n_sessions, **options)
+    return asyncio.run(host.run())
+
+
+def test_sessions_finish_every_episode():
+    connectors = {}
+
+    def factory(session_id):
+        connectors[session_id] = LocalConnector(OptimalPolicy(), 20, idle_every=5)
+        return connectors[session_id]
+
+    stats = run(factory, 3)
+    assert sorted(stats) == ['session-0', 'session-1', 'session-2']
+    for session_id, session_stats in stats.items():
+        assert session_stats.episodes == 20
+        assert session_stats.events['EPISODE_FINISH'] == 20
+        # No idle event after the last episode
+        assert session_stats.events['IDLE'] == 3
+        assert session_stats.steps == connectors[session_id].steps
+        assert session_stats.error is None
+
+
+def test_concurrency_is_bounded():
+    stats = run(
+        lambda session_id: CountingConnector(OptimalPolicy(), 5, latency=0.002),
+        6, concurrency=2,
+    )
+    assert CountingConnector.most_waiting == 2
+    assert all(session_stats.episodes == 5 for session_stats in stats.values())
+
+
+def test_sessions_wait_concurrently():
+    def elapsed(concurrency):
+        start = time.perf_counter()
+        run(
+            lambda session_id: LocalConnector(OptimalPolicy(), 5, latency=0.005),
+            8, concurrency=concurrency,
+        )
+        return time.perf_counter() - start
+
+    assert elapsed(8) < elapsed(1) / 2
+
+
+def test_unregister_ends_session():
+    stats = run(lambda session_id: UnregisteringConnector(OptimalPolicy(), 10), 2)
+    for session_stats in stats.values():
+        assert session_stats.episodes == 2
+        assert session_stats.events['UNREGISTER'] == 1
+
+
+def test_failing_session_does_not_stop_others():
+    def factory(session_id):
+        if session_id == 'session-1':
+            return FailingConnector(OptimalPolicy(), 10)
+        return LocalConnector(OptimalPolicy(), 10)
+
+    stats = run(factory, 3)
+    assert 'ConnectionError' in stats['session-1'].error
+    assert stats['session-0'].episodes == stats['session-2'].episodes == 10
+
+
+def test_sigint_stops_sessions():
+    stats = run(lambda session_id: InterruptingConnector(OptimalPolicy(), 100), 2)
+    for session_stats in stats.values():
+        assert 3 <= session_stats.episodes < 100
+        assert session_stats.error is None
+    assert signal.getsignal(signal.SIGINT) is signal.default_int_handler
@@ -0,0 +1,61 @@
+import subprocess
+import sys
+
+import pytest
+
+BonsaiEventType = pytest.importorskip('bonsai_connector.connector').BonsaiEventType
+
+from blackjack import runner  # noqa: E402
+from blackjack.blackjack import SimulatorModel  # noqa: E402
+from blackjack.local import LocalConnector, drive, run_local  # noqa: E402
+from blackjack.policies import OptimalPolicy  # noqa: E402
+
+
+def test_connector_event_sequence():
+    connector = LocalConnector(OptimalPolicy(), n_episodes=3, idle_every=2)
+    sim = SimulatorModel()
+    events = []
+    state = None
+    while not connector.done:
+        event = connector.next_event(state)
+        events.append(event.event_type)
+        state = sim.dispatch_event(event)
+
+    assert events.count(BonsaiEventType.EPISODE_START) == 3
+    assert events.count(BonsaiEventType.EPISODE_FINISH) == 3
+    assert events.count(BonsaiEventType.IDLE) == 1
+    assert events.count(BonsaiEventType.EPISODE_STEP) == connector.steps
+    assert events[0] == BonsaiEventType.EPISODE_START
+    assert events[-1] == BonsaiEventType.EPISODE_FINISH
+    finish = events.index(BonsaiEventType.EPISODE_FINISH)
+    assert events[finish + 1] == BonsaiEventType.EPISODE_START
+
+
+def test_drive_finishes_every_episode():
+    connector = LocalConnector(OptimalPolicy(), n_episodes=50, config={'decks': 6})
+    sim = SimulatorModel()
+    assert drive(sim, connector) > 0
+    assert connector.episodes == 50
+    assert sim.shoe.decks == 6
+
+
+@pytest.mark.parametrize('policy', ['optimal', 'random_conservative'])
+def test_run_local(policy):
+    run = run_local(30, policy)
+    assert run['episodes'] == 30
+    assert run['steps'] >= 30
+    assert run['episodes_per_second'] > 0
+
+
+def test_supervise_restarts_failing_instances(monkeypatch):
+    launched = []
+
+    def launch(argv):
+        launched.append(argv)
+        code = 1 if len(launched) <= 3 else 0
+        return subprocess.Popen([sys.executable, '-c', f'exit({code})'])
+
+    monkeypatch.setattr(runner, '_launch', launch)
+    codes = runner.supervise(2, max_restarts=1, poll_interval=0.05)
+    assert sorted(codes) == [0, 1]
+    assert len(launched) == 4
@@ -0,0 +1,20 @@
+from blackjack.parallel import evaluate_parallel
+from blackjack.policies import get_mean_reward
+
+
+def test_parallel_reward_does_not_depend_on_workers(monkeypatch):
+    monkeypatch.setattr('blackjack.parallel.CHUNK_SIZE', 50)
+    kwargs = {'host': 'localhost', 'port': 5000, 'seed': 42}
+    serial = evaluate_parallel(420, 'random', workers=1, **kwargs)
+    parallel = evaluate_parallel(420, 'random', workers=3, **kwargs)
+    assert serial == parallel
+    assert sum(serial.values()) == 420
+    assert get_mean_reward(serial) == get_mean_reward(parallel)
+
+
+def test_parallel_stops_on_target_stderr(monkeypatch):
+    monkeypatch.setattr('blackjack.parallel.CHUNK_SIZE', 500)
+    results = evaluate_parallel(
+        100_000, 'random', host='localhost', port=5000, seed=1, target_stderr=0.1,
+    )
+    assert results.n == 1_000
@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from blackjack.blackjack import MASKS, Card, Hand, Observation, SimulatorModel
+from blackjack.compiler import reachable_states, representative_game
+from blackjack.policies import (
+    MAX_HALTED_STEPS, BasicPolicy, Policy, RandomPolicy, make_model, play_games,
+)
+from blackjack.solver import table_index
+
+
+def basic_action(player, soft, upcard, first_step, pair=False, split=False):
+    return BasicPolicy().step({
+        'observation': Observation(player, soft, pair, upcard, first_step),
+        'mask': MASKS[first_step, not split, pair],
+    })['command']
+
+
+@pytest.mark.parametrize("state, action", [
+    ((16, False, 10, True), 3),
+    ((15, False, 10, True), 3),
+    ((11, False, 6, True), 2),
+    ((11, False, 6, False), 1),
+    ((18, True, 6, True), 2),
+    ((18, True, 9, True), 1),
+    ((18, True, 6, False), 0),
+    ((17, True, 4, False), 1),
+    ((13, False, 2, False), 0),
+    ((12, False, 2, True), 1),
+    ((16, False, 10, True, True), 4),
+    ((12, True, 10, True, True), 4),
+    ((20, False, 6, True, True), 0),
+    ((18, False, 7, True, True), 0),
+    ((16, False, 10, True, False, True), 1),
+])
+def test_basic_policy_actions(state, action):
+    assert basic_action(*state) == action
+
+
+def test_basic_table_matches_strategy_matrix():
+    table = BasicPolicy.decision_table()
+    for state in reachable_states():
+        game = representative_game(*state)
+        action = BasicPolicy.strategy_matrix(
+            game.player_hand, game.dealer_hand, game.player_hand.has_ace(),
+            game.first_step,
+        )
+        assert table[table_index(*state)] == action
+
+
+@pytest.mark.parametrize("upcard", range(2, 12))
+def test_basic_table_soft_totals(upcard):
+    table = BasicPolicy.decision_table()
+    for first_step in (True, False):
+        assert table[table_index(21, True, upcard, first_step)] == 0
+        soft_19 = table[table_index(19, True, upcard, first_step)]
+        assert soft_19 == (2 if first_step and upcard == 6 else 0)
+    # A soft 13 of three cards hits, it is not a hard 13
+    assert table[table_index(13, True, upcard, False)] == 1
+
+
+@pytest.mark.parametrize("rank", ['J', 'Q', 'K'])
+def test_basic_strategy_treats_ten_valued_upcards_alike(rank):
+    player = Hand([Card('10', 'x'), Card('5', 'x')])
+    ten = BasicPolicy.strategy_matrix(player, Hand([Card('10', 'x')]), False)
+    assert BasicPolicy.strategy_matrix(player, Hand([Card(rank, 'x')]), False) == ten
+
+
+@pytest.mark.parametrize("model", [SimulatorModel, None])
+def test_basic_policy_plays_live_games(model):
+    random.seed(0)
+    policy = BasicPolicy()
+    results = play_games(500, policy, model() if model else make_model(policy))
+    assert results.n == 500
+    assert abs(results.mean) < 0.2
+
+
+class SplitPolicy(Policy):
+    """Split every hand, which halts the games of non-pairs."""
+    observed_fields = ()
+
+    def __init__(self, deterministic):
+        self.deterministic = deterministic
+        self.steps = 0
+
+    def step(self, state):
+        self.steps += 1
+        return {'command': 4}
+
+
+@pytest.mark.parametrize('deterministic, max_halted', [
+    (True, 1), (False, MAX_HALTED_STEPS),
+])
+def test_halted_games_are_given_up(deterministic, max_halted):
+    policy = SplitPolicy(deterministic)
+    results = play_games(200, policy, make_model(policy))
+    assert results.n + results.halted == 200
+    assert results.halted > 150
+    # Pairs are split before the game is given up
+    assert policy.steps >= results.halted * max_halted
+
+
+def test_halted_steps_are_played_again():
+    random.seed(0)
+    policy = RandomPolicy((0, 1, 2))
+    results = play_games(500, policy, make_model(policy))
+    assert results.n == 500
+    assert results.halted == 0
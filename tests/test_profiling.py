@@ -0,0 +1,64 @@
+import io
+import logging
+
+from blackjack.blackjack import Blackjack, Hand, Shoe, SimulatorModel, logger
+from blackjack.policies import BasicPolicy, make_model, play_games
+from blackjack.profiling import Profiler, profile
+
+
+def test_profiler_counts_phases():
+    policy = BasicPolicy()
+    with Profiler() as profiler:
+        play_games(50, policy, make_model(policy))
+    assert profiler.calls['reset'] == 50
+    assert profiler.calls['deal'] >= 50
+    assert profiler.calls['policy'] == profiler.calls['step'] > 0
+    assert profiler.calls['hand_value'] > 0
+    assert profiler.seconds['reset'] > 0
+    assert 'exception' not in profiler.calls
+
+
+def test_profiler_only_times_simulator_exceptions(caplog):
+    sim = SimulatorModel()
+    sim.reset({})
+    with caplog.at_level(logging.ERROR), Profiler() as profiler:
+        logging.getLogger('other').exception('Unrelated.')
+        sim.step({'command': 9})
+    assert profiler.calls['exception'] == 1
+    assert len(caplog.records) == 2
+    assert 'exception' not in vars(logger)
+
+
+def test_profiler_restores_originals():
+    originals = [
+        Hand.__dict__['value'], Shoe.pick, Blackjack.play,
+        SimulatorModel.step, BasicPolicy.step, logger.exception,
+    ]
+    with Profiler():
+        assert Hand.__dict__['value'] is not originals[0]
+        assert SimulatorModel.step is not originals[3]
+    assert [
+        Hand.__dict__['value'], Shoe.pick, Blackjack.play,
+        SimulatorModel.step, BasicPolicy.step, logger.exception,
+    ] == originals
+
+
+def test_profiler_report():
+    with Profiler() as profiler:
+        play_games(10, BasicPolicy(), make_model(BasicPolicy()))
+    file = io.StringIO()
+    profiler.report(file)
+    lines = file.getvalue().splitlines()
+    assert lines[0].split() == ['phase', 'calls', 'seconds', 'us/call', 'share']
+    assert any(line.split()[:2] == ['reset', '10'] for line in lines)
+    assert lines[-1].split()[0] == 'total'
+
+
+def test_profile_prints_and_saves(tmp_path, capsys):
+    output = tmp_path / 'stats.prof'
+    with profile(output, top=5):
+        play_games(10, BasicPolicy(), make_model(BasicPolicy()))
+    out = capsys.readouterr().out
+    assert 'Time by phase:' in out
+    assert 'cumulative' in out
+    assert output.exists()
@@ -0,0 +1,73 @@
+import random
+
+import numpy as np
+import pytest
+
+from blackjack.policies import OptimalPolicy, RandomPolicy, make_model, play_games
+from blackjack.replay import (
+    RECORDED_FIELDS, EpisodeRecorder, ReplayReader, pack_masks, unpack_masks,
+)
+
+
+@pytest.mark.parametrize('masks', [
+    [[1, 1, 1, 1, 1]],
+    [[1, 1, 0, 1, 0], [1, 1, 1, 1, 1], [0, 0, 0, 0, 0], [1, 0, 1, 0, 1]],
+])
+def test_masks_round_trip(masks):
+    bits = pack_masks(masks)
+    assert bits.dtype == np.uint8
+    np.testing.assert_array_equal(unpack_masks(bits), masks)
+    np.testing.assert_array_equal(unpack_masks(bits, 3), np.array(masks)[:, :3])
+
+
+def record_games(directory, n_games, policy, chunk_size=7):
+    model = make_model(policy, RECORDED_FIELDS)
+    with EpisodeRecorder(directory, chunk_size=chunk_size) as recorder:
+        return play_games(n_games, policy, model, recorder=recorder)
+
+
+@pytest.mark.parametrize('policy', [OptimalPolicy(), RandomPolicy((0, 1, 2))])
+def test_replay_matches_played_games(tmp_path, policy, capsys):
+    random.seed(0)
+    results = record_games(tmp_path, 50, policy)
+    replay = ReplayReader(tmp_path)
+
+    finished = replay['result'] >= 0
+    assert finished.sum() == results.n == 50
+    np.testing.assert_array_equal(np.unique(replay['episode']), np.arange(50))
+    assert replay['reward'][finished].sum() == pytest.approx(results.mean * 50)
+    assert (replay['step'][replay['step'] > 0] ==
+            replay['step'][np.flatnonzero(replay['step'] > 0) - 1] + 1).all()
+    # Double-down is allowed at the first step
+    assert unpack_masks(replay['mask'])[replay['step'] == 0, :4].all()
+
+
+def test_replay_appends_episodes(tmp_path, capsys):
+    record_games(tmp_path, 10, OptimalPolicy())
+    length = len(ReplayReader(tmp_path))
+    record_games(tmp_path, 5, OptimalPolicy())
+    replay = ReplayReader(tmp_path)
+    assert len(replay) > length
+    assert replay['episode'][-1] == 14
+
+
+def test_replay_chunks_are_views(tmp_path, capsys):
+    record_games(tmp_path, 20, OptimalPolicy())
+    replay = ReplayReader(tmp_path)
+    chunks = list(replay.chunks(size=8))
+    assert sum(len(chunk['episode']) for chunk in chunks) == len(replay)
+    assert isinstance(chunks[0]['player'], np.memmap)
+
+
+def test_empty_replay(tmp_path):
+    replay = ReplayReader(tmp_path)
+    assert len(replay) == 0
+    assert list(replay.chunks()) == []
+
+
+def test_replay_ends_given_up_episodes(tmp_path, capsys):
+    random.seed(0)
+    results = record_games(tmp_path, 20, RandomPolicy((4,)))
+    replay = ReplayReader(tmp_path)
+    assert results.n + results.halted == 20
+    np.testing.assert_array_equal(np.unique(replay['episode']), np.arange(20))
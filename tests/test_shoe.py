@@ -0,0 +1,115 @@
+import collections
+import random
+
+import pytest
+
+from blackjack.blackjack import FRENCH_DECK, Shoe, SimulatorModel
+
+
+def test_shoe_holds_all_decks():
+    shoe = Shoe(decks=6)
+    assert len(shoe) == 6 * 52
+    counts = collections.Counter(shoe.pick(len(shoe)))
+    assert set(counts) == set(FRENCH_DECK)
+    assert set(counts.values()) == {6}
+
+
+@pytest.mark.parametrize("decks, penetration", [(0, 0.5), (9, 0.5), (1, 1.5)])
+def test_shoe_rejects_invalid_config(decks, penetration):
+    with pytest.raises(ValueError):
+        Shoe(decks, penetration)
+
+
+def test_shoe_reshuffles_after_cut_card():
+    model = SimulatorModel()
+    config = {'decks': 2, 'penetration': 0.5}
+    model.reset(config)
+    shoe = model.shoe
+    cursors = [shoe.cursor]
+    while not shoe.needs_shuffle:
+        model.reset(config)
+        assert model.shoe is shoe
+        cursors.append(shoe.cursor)
+    assert cursors == sorted(cursors)
+    model.reset(config)
+    assert shoe.cursor == 3
+
+
+def test_default_shoe_is_reshuffled_every_episode():
+    model = SimulatorModel()
+    model.reset({})
+    assert model.shoe.decks == 1
+    model.reset({})
+    assert model.shoe.cursor == 3
+
+
+def test_new_config_builds_new_shoe():
+    model = SimulatorModel()
+    model.reset({'decks': 1})
+    shoe = model.shoe
+    model.reset({'decks': 4})
+    assert model.shoe is not shoe and len(model.shoe.cards) == 4 * 52
+
+
+def chi_square(counts, other):
+    """Return the statistic of the chi-square test of homogeneity of two samples."""
+    n, m = sum(counts.values()), sum(other.values())
+    statistic = 0
+    for cell in set(counts) | set(other):
+        total = counts[cell] + other[cell]
+        for observed, size in ((counts[cell], n), (other[cell], m)):
+            expected = total * size / (n + m)
+            statistic += (observed - expected) ** 2 / expected
+    return statistic
+
+
+def test_dealt_cards_match_full_shuffle():
+    rng = random.Random(0)
+    shoe = Shoe(rng=rng)
+    lazy = collections.Counter()
+    full = collections.Counter()
+    for _ in range(20_000):
+        shoe.shuffle()
+        lazy.update(enumerate(card.rank for card in shoe.pick(6)))
+        deck = list(FRENCH_DECK)
+        rng.shuffle(deck)
+        full.update(enumerate(card.rank for card in deck[:6]))
+    # 13 ranks at 6 positions, 77 degrees of freedom, p-value 0.001
+    assert chi_square(lazy, full) < 121.1
+
+
+def test_model_is_seeded_by_config():
+    def deal(model, config):
+        model.reset(config)
+        game = model.blackjack
+        return tuple(game.player_hand.cards + game.dealer_hand.cards)
+
+    model = SimulatorModel()
+    games = [deal(model, {'seed': 42}) for _ in range(5)]
+    assert [deal(SimulatorModel(), {'seed': 42})] == games[:1]
+    # The generator is only seeded again when the seed changes
+    assert len(set(games)) > 1
+    deal(model, {'seed': 7})
+    assert deal(model, {'seed': 42}) == games[0]
+
+
+def test_models_use_their_own_generator():
+    random.seed(1)
+    model = SimulatorModel()
+    random.seed(1)
+    other = SimulatorModel()
+    state = random.getstate()
+    model.reset({})
+    other.reset({})
+    assert random.getstate() == state
+    assert model.blackjack.player_hand.cards == other.blackjack.player_hand.cards
+
+
+def test_shoe_running_out_keeps_cards_in_play():
+    shoe = Shoe(decks=1, penetration=1.0)
+    shoe.pick(50)
+    shoe.start_game()
+    in_play = shoe.pick(2)
+    dealt = shoe.pick(50)
+    assert len(set(in_play + dealt)) == 52
+    assert len(shoe) == 0
@@ -0,0 +1,38 @@
+import pytest
+
+from blackjack.solver import (
+    CARD_PROBABILITIES, best_action, dealer_outcomes, load_table, solve, table_index,
+)
+
+
+def test_card_probabilities_sum_to_one():
+    assert sum(CARD_PROBABILITIES.values()) == pytest.approx(1)
+
+
+@pytest.mark.parametrize("upcard", range(2, 12))
+def test_dealer_outcomes_sum_to_one(upcard):
+    outcomes = dealer_outcomes(upcard, upcard == 11)
+    assert sum(outcomes.values()) == pytest.approx(1)
+    assert min(outcomes) >= 17
+
+
+decisions = [
+    ((20, False, 10, True), 0),
+    ((12, False, 2, False), 1),
+    ((11, False, 6, True), 2),
+    ((11, False, 6, False), 1),
+    ((16, False, 10, True), 3),
+    ((19, True, 6, True), 0),
+    ((17, True, 3, True), 2),
+]
+
+
+@pytest.mark.parametrize("state, action", decisions)
+def test_best_action(state, action):
+    assert best_action(*state) == action
+
+
+def test_saved_table_is_up_to_date():
+    table = load_table()
+    assert list(table) == solve()
+    assert table[table_index(11, False, 6, True)] == 2
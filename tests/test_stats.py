@@ -0,0 +1,63 @@
+import statistics
+
+import pytest
+
+from blackjack.blackjack import SimulatorModel
+from blackjack.policies import OptimalPolicy, get_mean_reward, get_reward, play_games
+from blackjack.stats import DifferenceStats, RewardStats
+
+results = [
+    (0, False, False), (0, False, True), (1, False, False), (2, True, False),
+    (2, False, False), (2, False, False), (0, True, False),
+]
+
+
+def test_reward_stats_match_full_results():
+    stats = RewardStats(results)
+    rewards = [get_reward(result) for result in results]
+    assert stats.n == len(results)
+    assert stats.mean == pytest.approx(statistics.mean(rewards))
+    assert stats.mean == get_mean_reward(results)
+    assert stats.variance == pytest.approx(statistics.variance(rewards))
+    low, high = stats.ci95
+    assert low < stats.mean < high
+
+
+def test_reward_stats_merge():
+    merged = RewardStats(results[:3])
+    merged.update(RewardStats(results[3:]))
+    assert merged == RewardStats(results)
+
+
+def test_play_games_stops_on_target_stderr(capsys):
+    stats = play_games(
+        100_000, OptimalPolicy(), SimulatorModel(), report_every=500,
+        target_stderr=0.05,
+    )
+    assert 1_000 <= stats.n < 2_000 and stats.n % 100 == 0
+    assert stats.stderr <= 0.05
+    assert '500 games: ' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('report_every', [None, 0])
+def test_target_stderr_without_reports(report_every, capsys):
+    stats = play_games(
+        100_000, OptimalPolicy(), SimulatorModel(), report_every=report_every,
+        target_stderr=0.05,
+    )
+    assert stats.n == 1_000
+    assert capsys.readouterr().out == ''
+
+
+def test_target_needs_enough_games():
+    draws = RewardStats([(1, False, False)] * 10)
+    assert draws.stderr == 0
+    assert not draws.reached(0.01)
+    assert draws.reached(0.01, min_games=10)
+
+
+def test_difference_stats():
+    differences = [0, 0, 1.5, -1, 2, 0, -0.5]
+    stats = DifferenceStats(differences)
+    assert stats.mean == pytest.approx(statistics.mean(differences))
+    assert stats.variance == pytest.approx(statistics.variance(differences))